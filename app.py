@@ -1,15 +1,141 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, g
 import os
-from enhanced_worker_log_parser import EnhancedWorkerLogParser
+import json
+import uuid
+import queue
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import asdict
+from job_store import JobStore, file_digest
+from parse_pool import PoolBusy, get_parse_pool
+from live_feed import FeedFull, format_sse, get_live_feed
+from stage_latency import LatencyReport
 from werkzeug.utils import secure_filename
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['JOB_STORE'] = os.environ.get('JOB_STORE', 'jobs.db')
+# Parsing runs in a process pool shared by all requests
+app.config['PARSE_WORKERS'] = int(os.environ.get('PARSE_WORKERS', os.cpu_count() or 1))
+app.config['PARSE_QUEUE'] = int(os.environ.get('PARSE_QUEUE', 2 * app.config['PARSE_WORKERS']))
+app.config['PARSE_ADMISSION_TIMEOUT'] = float(os.environ.get('PARSE_ADMISSION_TIMEOUT', 5))
+app.config['PARSE_TIMEOUT'] = float(os.environ.get('PARSE_TIMEOUT', 300))
+app.config['PARSE_RETRY_AFTER'] = 10
+# How often a streamed upload checks the store for newly stored jobs
+app.config['STREAM_POLL_INTERVAL'] = 0.2
+# Worker log tailed by the /live feed
+app.config['LIVE_LOG_PATH'] = os.environ.get('LIVE_LOG_PATH')
+app.config['LIVE_HEARTBEAT'] = 15
+# Every /live client holds a server thread, so keep this well below the server's thread count
+app.config['LIVE_MAX_CLIENTS'] = int(os.environ.get('LIVE_MAX_CLIENTS', 4))
+app.config['LIVE_RETRY_AFTER'] = 30
 
 # Ensure upload folder exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+def get_store() -> JobStore:
+    """Open one job store connection per request."""
+    if 'job_store' not in g:
+        g.job_store = JobStore(app.config['JOB_STORE'])
+    return g.job_store
+
+@app.teardown_appcontext
+def close_store(exception):
+    store = g.pop('job_store', None)
+    if store is not None:
+        store.close()
+
+def unique_upload_path(filename: str) -> str:
+    """Upload path that concurrent uploads of the same filename can't clash on."""
+    return os.path.abspath(os.path.join(app.config['UPLOAD_FOLDER'], f"{uuid.uuid4().hex}_{filename}"))
+
+def remove_upload(filepath: str) -> None:
+    if os.path.exists(filepath):
+        os.remove(filepath)
+
+def source_results(store: JobStore, source_id: int):
+    """Build the upload response for a stored source."""
+    source = store.get_source(source_id)
+    unrecognized = source['unrecognized'] or {}
+    return {
+        'source_id': source_id,
+        'jobs': [asdict(job) for job in store.query_jobs(source_id=source_id)],
+        'unrecognized_lines': unrecognized.get('lines', []),
+        'unrecognized_stats': unrecognized.get('stats', {})
+    }
+
+def stream_source_results(source_id: int) -> Response:
+    """Stream a stored source as NDJSON: a header line, then one line per job."""
+    db_path = app.config['JOB_STORE']
+
+    def generate():
+        # The request's store connection is closed before streaming ends, so use our own
+        with JobStore(db_path) as store:
+            source = store.get_source(source_id)
+            unrecognized = source['unrecognized'] or {}
+            yield json.dumps({
+                'type': 'source',
+                'source_id': source_id,
+                'job_count': source['job_count'],
+                'unrecognized_lines': unrecognized.get('lines', []),
+                'unrecognized_stats': unrecognized.get('stats', {})
+            }) + '\n'
+            for job in store.query_jobs(source_id=source_id):
+                yield json.dumps({'type': 'job', 'job': asdict(job)}) + '\n'
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
+def stream_ingest_results(future, digest: str) -> Response:
+    """Stream an upload as NDJSON while it is parsed: jobs as each batch is stored, then the source line.
+
+    A 'reset' line means the ingest being followed was abandoned and the jobs
+    start over; an 'error' line ends a failed parse.
+    """
+    db_path = app.config['JOB_STORE']
+    poll_interval = app.config['STREAM_POLL_INTERVAL']
+    deadline = time.monotonic() + app.config['PARSE_TIMEOUT']
+
+    def generate():
+        with JobStore(db_path) as store:
+            source_id = None
+            sent = 0
+            while True:
+                done = future.done()
+                if done and future.exception() is not None:
+                    app.logger.error(f"Error processing file: {future.exception()}")
+                    yield json.dumps({'type': 'error', 'error': str(future.exception())}) + '\n'
+                    return
+                # Identical uploads share one source, which may be another upload's ingest in progress
+                source = store.find_source(digest, finished_only=False)
+                current_id = future.result() if done else (source['id'] if source else None)
+                if current_id != source_id:
+                    if sent:
+                        yield json.dumps({'type': 'reset'}) + '\n'
+                    source_id, sent = current_id, 0
+                if source_id is not None:
+                    for job in store.query_jobs(source_id=source_id, offset=sent):
+                        yield json.dumps({'type': 'job', 'job': asdict(job)}) + '\n'
+                        sent += 1
+                if done:
+                    break
+                if time.monotonic() > deadline:
+                    yield json.dumps({'type': 'error', 'error': 'Parsing is taking too long, please retry later'}) + '\n'
+                    return
+                time.sleep(poll_interval)
+
+            source = store.get_source(source_id)
+            unrecognized = source['unrecognized'] or {}
+            yield json.dumps({
+                'type': 'source',
+                'source_id': source_id,
+                'job_count': source['job_count'],
+                'unrecognized_lines': unrecognized.get('lines', []),
+                'unrecognized_stats': unrecognized.get('stats', {})
+            }) + '\n'
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
 @app.route('/', methods=['GET'])
 def index():
     return render_template('index.html')
@@ -18,31 +144,122 @@ def index():
 def upload_file():
     if 'file' not in request.files:
         return jsonify({'error': 'No file part'}), 400
-    
+
     file = request.files['file']
     if file.filename == '':
         return jsonify({'error': 'No selected file'}), 400
-    
+
+    filepath = None
     try:
         filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        filepath = unique_upload_path(filename)
         file.save(filepath)
-        
-        # Parse the log file
-        parser = EnhancedWorkerLogParser()
-        results = parser.parse_log(filepath)
-        
-        # Clean up
-        os.remove(filepath)
-        
-        return jsonify(results)
+        stream = request.args.get('stream', type=int)
+        digest = file_digest(filepath) if stream else None
+
+        # Parse the log file into the store in the shared process pool,
+        # reusing earlier results for identical uploads
+        future = get_parse_pool(
+            app.config['PARSE_WORKERS'], app.config['PARSE_QUEUE'], app.config['PARSE_ADMISSION_TIMEOUT']
+        ).submit(app.config['JOB_STORE'], filepath)
+        # The worker owns the upload now; clean up once it is done with it
+        future.add_done_callback(lambda _, path=filepath: remove_upload(path))
+        filepath = None
+        if stream:
+            return stream_ingest_results(future, digest)
+        source_id = future.result(timeout=app.config['PARSE_TIMEOUT'])
+        return jsonify(source_results(get_store(), source_id))
+    except PoolBusy as e:
+        app.logger.warning(f"Rejecting upload: {e}")
+        response = jsonify({'error': 'Server is busy parsing other uploads, please retry shortly'})
+        response.headers['Retry-After'] = str(app.config['PARSE_RETRY_AFTER'])
+        return response, 503
+    except FutureTimeoutError:
+        return jsonify({'error': 'Parsing is taking too long, please retry later'}), 504
     except Exception as e:
         app.logger.error(f"Error processing file: {str(e)}", exc_info=True)
         return jsonify({'error': f'Error processing file: {str(e)}'}), 500
     finally:
         # Ensure file is cleaned up even if there's an error
-        if os.path.exists(filepath):
-            os.remove(filepath)
+        if filepath:
+            remove_upload(filepath)
+
+@app.route('/sources/<int:source_id>', methods=['GET'])
+def get_source(source_id):
+    store = get_store()
+    if store.get_source(source_id) is None:
+        return jsonify({'error': f'Unknown source {source_id}'}), 404
+    if request.args.get('stream', type=int):
+        return stream_source_results(source_id)
+    return jsonify(source_results(store, source_id))
+
+def job_filters():
+    """Read the job query filters shared by /jobs and /latency."""
+    return {
+        'source_id': request.args.get('source_id', type=int),
+        'client_hotkey': request.args.get('client_hotkey'),
+        'status': request.args.get('status'),
+        'video_id': request.args.get('video_id'),
+        'since': request.args.get('since'),
+        'until': request.args.get('until')
+    }
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    """Query stored jobs, e.g. /jobs?client_hotkey=5F...&status=failed&since=2024-06-18"""
+    limit = request.args.get('limit', default=1000, type=int)
+    offset = request.args.get('offset', default=0, type=int)
+
+    jobs = get_store().query_jobs(limit=limit, offset=offset, **job_filters())
+    return jsonify({'jobs': [asdict(job) for job in jobs]})
+
+@app.route('/latency', methods=['GET'])
+def latency_report():
+    """Stage latency and timeout headroom over the stored jobs matching the filters."""
+    include_jobs = request.args.get('jobs', default=0, type=int)
+    report = LatencyReport()
+    breakdowns = []
+    for job in get_store().query_jobs(**job_filters()):
+        breakdown = report.add_job(job)
+        if include_jobs and breakdown is not None:
+            breakdowns.append(breakdown)
+
+    results = {'summary': report.summary()}
+    if include_jobs:
+        results['jobs'] = breakdowns
+    return jsonify(results)
+
+@app.route('/live', methods=['GET'])
+def live_jobs():
+    """Server-Sent Events feed of jobs completed in the configured worker log."""
+    log_path = app.config['LIVE_LOG_PATH']
+    if not log_path:
+        return jsonify({'error': 'Live feed is not configured, set LIVE_LOG_PATH'}), 404
+
+    feed = get_live_feed(log_path, app.config['LIVE_MAX_CLIENTS'])
+    heartbeat = app.config['LIVE_HEARTBEAT']
+    try:
+        events = feed.subscribe()
+    except FeedFull as e:
+        app.logger.warning(f"Rejecting live feed client: {e}")
+        response = jsonify({'error': 'Too many live feed viewers, please retry later'})
+        response.headers['Retry-After'] = str(app.config['LIVE_RETRY_AFTER'])
+        return response, 503
+
+    def generate():
+        yield format_sse('stats', feed.stats())
+        while True:
+            try:
+                yield events.get(timeout=heartbeat)
+            except queue.Empty:
+                # Comment line keeps proxies from closing an idle connection
+                yield ': keep-alive\n\n'
+
+    response = Response(generate(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Also runs if the client goes away before the stream starts
+    response.call_on_close(lambda: feed.unsubscribe(events))
+    return response
 
 if __name__ == '__main__':
-    app.run(debug=True) 
\ No newline at end of file
+    app.run(debug=True, threaded=True)
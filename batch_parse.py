@@ -0,0 +1,256 @@
+import os
+import ast
+import sys
+import glob
+import json
+import time
+import hashlib
+import argparse
+import logging
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import chain
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional
+
+from enhanced_worker_log_parser import EnhancedWorkerLogParser
+from log_merge import ROTATION_SUFFIX, group_rotations
+from log_reader import INDEX_SUFFIX, iter_log_lines
+from search_logs import log_stem
+
+# Files picked up when a directory is given, also when rotated or compressed (worker.log.1, worker.log.2.gz)
+LOG_EXTENSIONS = ('.log', '.txt')
+MANIFEST_NAME = 'manifest.json'
+# Outputs are rebuilt when this module or any local module it imports changes
+PARSER_MODULE = 'enhanced_worker_log_parser'
+
+logger = logging.getLogger(__name__)
+
+
+def local_imports(module: str, directory: str) -> List[str]:
+    """Paths of `module` and every module in `directory` it imports, directly or not."""
+    seen = {}
+    pending = [module]
+    while pending:
+        name = pending.pop()
+        path = os.path.join(directory, name + '.py')
+        if name in seen or not os.path.exists(path):
+            continue
+        seen[name] = path
+        with open(path, 'rb') as f:
+            tree = ast.parse(f.read(), path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                pending.extend(alias.name.split('.')[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                pending.append(node.module.split('.')[0])
+    return sorted(seen.values())
+
+
+def parser_version() -> str:
+    """Digest of the parser sources, so a parser change invalidates old outputs."""
+    digest = hashlib.sha1()
+    for path in local_imports(PARSER_MODULE, os.path.dirname(os.path.abspath(__file__))):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def is_log_file(path: str) -> bool:
+    return ROTATION_SUFFIX.sub('', path, count=1).endswith(LOG_EXTENSIONS)
+
+
+def expand_inputs(inputs: List[str], recursive: bool = True) -> List[str]:
+    """Resolve files, directories and glob patterns to a sorted list of log files."""
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(item, '**' if recursive else '', '*')
+            paths.update(p for p in glob.glob(pattern, recursive=recursive) if is_log_file(p))
+        elif glob.has_magic(item):
+            paths.update(glob.glob(item, recursive=True))
+        elif os.path.exists(item):
+            paths.add(item)
+        else:
+            logger.warning(f"No such file or directory: {item}")
+    return sorted(
+        os.path.abspath(p) for p in paths if os.path.isfile(p) and not p.endswith(INDEX_SUFFIX)
+    )
+
+
+def output_name(path: str) -> str:
+    # Logs with the same name in different directories get different outputs
+    return f"{log_stem(path)}-{hashlib.sha1(path.encode()).hexdigest()[:8]}"
+
+
+def load_manifest(manifest_path: str) -> Dict[str, Any]:
+    if not os.path.exists(manifest_path):
+        return {'parser_version': None, 'files': {}}
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(manifest: Dict[str, Any], manifest_path: str) -> None:
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def file_signature(path: str) -> Dict[str, int]:
+    stat = os.stat(path)
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def log_signature(log_paths: List[str]) -> Dict[str, Dict[str, int]]:
+    """Signatures of every file of a log, so a rotation or an appended line both count as a change."""
+    return {path: file_signature(path) for path in log_paths}
+
+
+def log_name(log_paths: List[str]) -> str:
+    """The log a group of rotated files belongs to: worker.log.1, worker.log.2.gz -> worker.log."""
+    return ROTATION_SUFFIX.sub('', log_paths[0], count=1)
+
+
+def expected_outputs(path: str, parquet: bool) -> List[str]:
+    name = output_name(path)
+    return [name + '.jsonl'] + ([name + '.parquet'] if parquet else [])
+
+
+def is_unchanged(entry: Optional[Dict[str, Any]], signature: Dict[str, Dict[str, int]],
+                 outputs: List[str], output_dir: str) -> bool:
+    """True if the log's files match the manifest and every wanted output is on disk."""
+    if not entry or entry.get('members') != signature:
+        return False
+    return all(
+        name in entry.get('outputs', []) and os.path.exists(os.path.join(output_dir, name)) for name in outputs
+    )
+
+
+def write_parquet(jobs: List[Dict[str, Any]], path: str) -> None:
+    import pandas as pd
+
+    frame = pd.json_normalize(jobs, sep='.')
+    # Lists (videos, proxies, ...) become JSON strings so every column has one type
+    for column in frame.columns:
+        if frame[column].map(lambda value: isinstance(value, (list, dict))).any():
+            frame[column] = frame[column].map(
+                lambda value: json.dumps(value) if isinstance(value, (list, dict)) else value
+            )
+    frame.to_parquet(path, index=False)
+
+
+def parse_log(log_paths: List[str], output_dir: str, parquet: bool) -> Dict[str, Any]:
+    """Parse one log into JSONL (and optionally Parquet); runs in a pool worker.
+
+    The rotated files of the log, oldest first, go through one parser so a
+    job cut by a rotation stays whole.
+    """
+    started = time.time()
+    outputs = expected_outputs(log_name(log_paths), parquet)
+    jsonl_name = outputs[0]
+    parser = EnhancedWorkerLogParser()
+    rows = []
+    job_count = 0
+
+    tmp_path = os.path.join(output_dir, jsonl_name + '.tmp')
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            lines = chain.from_iterable(iter_log_lines(path) for path in log_paths)
+            for job in parser.iter_jobs_from_lines(lines):
+                job_dict = asdict(job)
+                f.write(json.dumps(job_dict) + '\n')
+                job_count += 1
+                if parquet:
+                    rows.append(job_dict)
+        os.replace(tmp_path, os.path.join(output_dir, jsonl_name))
+
+        if parquet:
+            tmp_path = os.path.join(output_dir, outputs[1] + '.tmp')
+            write_parquet(rows, tmp_path)
+            os.replace(tmp_path, os.path.join(output_dir, outputs[1]))
+    finally:
+        # Only left behind if writing failed partway
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return {
+        'outputs': outputs,
+        'jobs': job_count,
+        'unrecognized': parser.unrecognized_lines.stats(),
+        'seconds': round(time.time() - started, 3)
+    }
+
+
+def run_batch(inputs: List[str], output_dir: str, workers: Optional[int] = None,
+              parquet: bool = False, force: bool = False) -> Dict[str, int]:
+    """Parse every changed input and update the manifest; returns counts."""
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+    version = parser_version()
+    if manifest.get('parser_version') != version:
+        if manifest['files']:
+            logger.info("Parser changed since the last run, rebuilding all outputs")
+        manifest = {'parser_version': version, 'files': {}}
+
+    pending = {}
+    skipped = 0
+    for log_paths in group_rotations(expand_inputs(inputs)):
+        name = log_name(log_paths)
+        signature = log_signature(log_paths)
+        outputs = expected_outputs(name, parquet)
+        if not force and is_unchanged(manifest['files'].get(name), signature, outputs, output_dir):
+            skipped += 1
+            continue
+        pending[name] = (log_paths, signature)
+
+    counts = {'parsed': 0, 'skipped': skipped, 'failed': 0}
+    if not pending:
+        return counts
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(parse_log, log_paths, output_dir, parquet): name
+            for name, (log_paths, _) in pending.items()
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            log_paths, signature = pending[name]
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"Failed to parse {name}: {e}")
+                counts['failed'] += 1
+                continue
+            manifest['files'][name] = {'members': signature, **result}
+            counts['parsed'] += 1
+            logger.info(f"Parsed {name} ({len(log_paths)} files): {result['jobs']} jobs in {result['seconds']}s")
+            # Saved as we go so an interrupted run keeps its progress
+            save_manifest(manifest, manifest_path)
+    return counts
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    arg_parser = argparse.ArgumentParser(
+        description='Parse worker logs in parallel to JSONL/Parquet, skipping files unchanged since the last run.'
+    )
+    arg_parser.add_argument('inputs', nargs='+', help='Log files, directories or glob patterns')
+    arg_parser.add_argument('-o', '--output-dir', default='parsed', help='Directory for outputs and the manifest')
+    arg_parser.add_argument('-j', '--workers', type=int, help='Parser processes (default: CPU count)')
+    arg_parser.add_argument('--parquet', action='store_true', help='Also write one Parquet file per log')
+    arg_parser.add_argument('--force', action='store_true', help='Reparse files even if they are unchanged')
+    args = arg_parser.parse_args()
+
+    if args.parquet and not (importlib.util.find_spec('pyarrow') or importlib.util.find_spec('fastparquet')):
+        raise SystemExit("Parquet output requires pandas with 'pyarrow' or 'fastparquet' installed")
+
+    counts = run_batch(args.inputs, args.output_dir, args.workers, args.parquet, args.force)
+    print(f"Parsed {counts['parsed']}, skipped {counts['skipped']} unchanged, {counts['failed']} failed "
+          f"(outputs in {args.output_dir})")
+    if counts['failed']:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
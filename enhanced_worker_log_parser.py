@@ -1,7 +1,8 @@
 import re
 import json
+import argparse
 from datetime import datetime
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Iterable, Iterator, Tuple
 from collections import defaultdict
 import logging
 from dataclasses import asdict, dataclass
@@ -9,6 +10,38 @@ from dataclasses import asdict, dataclass
 # Import the patterns
 from log_patterns import REQUEST_PATTERNS, VIDEO_SEARCH_PATTERNS, DOWNLOAD_PATTERNS, ERROR_PATTERNS, ALL_PATTERNS
 from log_line import LogLine
+from log_reader import iter_log_lines
+from unrecognized_lines import UnrecognizedLineStore
+
+# Substrings the extractors below react to
+RECOGNIZED_MARKERS = [
+    "Incoming request: UID", "Blacklisting", "Received scraping request:", "stake=",
+    "Random topic from list:", "Augmented query:", "Query augmentation took",
+    "duplicate search results", "Video search took", "Downloaded and clipped", "Using proxy:",
+    "Proxy used:", "Data received from load balancer:", "Received response:", "Embeddings generation took",
+    "unique videos prepared", "SCRAPING", "Emission/day"
+]
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+# Regexes only look at this many characters of a line, so one huge line
+# can't stall a parse; markers and the VideoMetadata split still see all of it
+MAX_LINE_LENGTH = 8192
+# "N. <video_id>: <title> [start..end] <views>" as the whole log message
+FINAL_VIDEO_PATTERN = re.compile(r'(?:^|\| )\d+\. ([^:\s]+): (.*) \[(\d+\.\.\d+)\] (\d+)\s*$')
+# Matched at the start of each "VideoMetadata(" chunk of a response line
+VIDEO_METADATA_PATTERN = re.compile(
+    r"video_id='([^']+)', description='([^']+)', views=(\d+), start_time=(\d+), end_time=(\d+)"
+)
+# "Downloaded video <id> in <t> s. Proxy used: <proxy> (<t>)" is matched in two
+# anchored pieces; a lazy gap between them backtracks quadratically on long lines
+DOWNLOADED_VIDEO_PATTERN = re.compile(r'Downloaded video (\S+)')
+PROXY_USED_PATTERN = re.compile(r'Proxy used: (\S+) \((\d+(?:\.\d+)?)\)')
+KNOWN_PATTERN = re.compile('|'.join(
+    f'(?:{p})' for log_pattern in ALL_PATTERNS.values() for p in log_pattern.patterns
+))
+
+def proxy_address(proxy: str) -> str:
+    """Strip credentials from a proxy URL, keeping host:port."""
+    return proxy.rsplit('@', 1)[-1]
 
 @dataclass
 class WorkerJob:
@@ -26,46 +59,86 @@ class WorkerJob:
 class EnhancedWorkerLogParser:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
-        self.unrecognized_lines: List[str] = []
+        self.unrecognized_lines = UnrecognizedLineStore()
         self.current_job: Optional[WorkerJob] = None
         self.jobs: List[WorkerJob] = []
+        self.job_count = 0
+        self.current_lines: List[str] = []
         
     def parse_log(self, log_path: str) -> Dict[str, Any]:
         """Parse the entire log file and return structured data."""
         try:
-            with open(log_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-
-            current_lines = []
-            for line in lines:
-                # New job starts with "Incoming request: UID"
-                if "Incoming request: UID" in line:
-                    if current_lines:
-                        self._process_job(current_lines)
-                    current_lines = []
-                current_lines.append(line)
-            
-            # Process last job
-            if current_lines:
-                self._process_job(current_lines)
+            for job in self.iter_jobs(log_path):
+                self.jobs.append(job)
 
             return {
                 'jobs': [asdict(job) for job in self.jobs],
-                'unrecognized_lines': self.unrecognized_lines
+                'unrecognized_lines': self.unrecognized_lines.to_list(),
+                'unrecognized_stats': self.unrecognized_lines.stats()
             }
 
         except Exception as e:
             self.logger.error(f"Error parsing log file: {e}")
             raise
 
-    def _process_job(self, lines: List[str]) -> None:
+    def iter_jobs(self, log_path: str) -> Iterator[WorkerJob]:
+        """Stream jobs from a (possibly compressed) log file without keeping them in memory."""
+        yield from self.iter_jobs_from_lines(iter_log_lines(log_path))
+
+    def iter_jobs_from_lines(self, lines: Iterable[str]) -> Iterator[WorkerJob]:
+        """Group lines into jobs and yield each job as soon as it is complete."""
+        for line in lines:
+            job = self.feed_line(line)
+            if job is not None:
+                yield job
+
+        # Process last job
+        job = self.flush()
+        if job is not None:
+            yield job
+
+    def feed_line(self, line: str) -> Optional[WorkerJob]:
+        """Add one line; returns the previous job once the next one starts."""
+        if not self._is_recognized(line):
+            self.unrecognized_lines.add(line)
+        job = None
+        # New job starts with "Incoming request: UID"
+        if "Incoming request: UID" in line:
+            if self.current_lines:
+                job = self._process_job(self.current_lines)
+            self.current_lines = []
+        self.current_lines.append(line)
+        return job
+
+    def flush(self) -> Optional[WorkerJob]:
+        """Process whatever lines are pending as a final job."""
+        if not self.current_lines:
+            return None
+        job = self._process_job(self.current_lines)
+        self.current_lines = []
+        return job
+
+    def _is_recognized(self, line: str) -> bool:
+        """Check whether any extractor or known LogPattern covers this line."""
+        if not line.strip():
+            return True
+        if any(marker in line for marker in RECOGNIZED_MARKERS):
+            return True
+        line = line[:MAX_LINE_LENGTH]
+        if FINAL_VIDEO_PATTERN.search(line):
+            return True
+        return KNOWN_PATTERN.search(line) is not None
+
+    def _process_job(self, lines: List[str]) -> WorkerJob:
         """Process a single job's lines."""
         # Extract request info first to check if blacklisted
         request_info = self._extract_request_info(lines)
         self.logger.debug(f"Extracted request info: {request_info}")
         
         # Create job with minimal info first
-        job = WorkerJob(job_id=str(len(self.jobs)))
+        job = WorkerJob(job_id=str(self.job_count))
+        self.job_count += 1
+        job.start_time, job.end_time = self._extract_time_range(lines)
         
         # Set client hotkey if available
         if 'client_hotkey' in request_info:
@@ -78,8 +151,7 @@ class EnhancedWorkerLogParser:
             self.logger.debug("Request was blacklisted")
             job.status = "blacklisted"
             job.stages = {'request': request_info}
-            self.jobs.append(job)
-            return
+            return job
 
         # Continue with full processing for non-blacklisted requests
         self.logger.debug("Processing non-blacklisted request")
@@ -105,21 +177,51 @@ class EnhancedWorkerLogParser:
         else:
             job.status = "failed"
         
-        # Add to jobs list
-        self.jobs.append(job)
+        return job
 
     def _extract_timestamp(self, line: str) -> Optional[str]:
-        match = re.search(r'\[34m(.*?)\[39m', line)
+        match = re.search(r'\[34m(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d{3})', line[:MAX_LINE_LENGTH])
         return match.group(1) if match else None
 
+    def _extract_time_range(self, lines: List[str]) -> Tuple[Optional[str], Optional[str]]:
+        """Return the first and last timestamps seen in a job's lines."""
+        start_time = None
+        for line in lines:
+            start_time = self._extract_timestamp(line)
+            if start_time:
+                break
+        end_time = None
+        for line in reversed(lines):
+            end_time = self._extract_timestamp(line)
+            if end_time:
+                break
+        return start_time, end_time
+
+    def _seconds_since_previous_line(self, lines: List[str], index: int) -> Optional[float]:
+        """Seconds between lines[index] and the closest earlier timestamped line."""
+        current = self._extract_timestamp(lines[index])
+        if not current:
+            return None
+        for line in reversed(lines[:index]):
+            previous = self._extract_timestamp(line)
+            if previous:
+                delta = datetime.strptime(current, TIMESTAMP_FORMAT) - datetime.strptime(previous, TIMESTAMP_FORMAT)
+                return delta.total_seconds()
+        return None
+
     def _extract_request_info(self, lines: List[str]) -> Dict[str, Any]:
         """Extract information about the request including client hotkey and blacklist status."""
         info = {}
         
         for i, line in enumerate(lines):
+            line = line[:MAX_LINE_LENGTH]
             # Look for incoming request line
             if "Incoming request: UID" in line:
                 self.logger.debug(f"Found request line: {line.strip()}")
+                request_match = re.search(r'UID (\d+) - HK \S+ - timeout (\d+(?:\.\d+)?) s', line)
+                if request_match:
+                    info['uid'] = int(request_match.group(1))
+                    info['timeout'] = float(request_match.group(2))
                 # Extract hotkey from the request line
                 hotkey_match = re.search(r'HK ([^\s]+) -', line)
                 if hotkey_match:
@@ -144,7 +246,7 @@ class EnhancedWorkerLogParser:
             # Only process these if request wasn't blacklisted
             elif not info.get('blacklisted', False):
                 if "Received scraping request:" in line:
-                    match = re.search(r'(\d+) videos for query \'(.*)\'', line)
+                    match = re.search(r'request: (\d+) videos for query \'(.*)\'', line)
                     if match:
                         info['requested_videos'] = int(match.group(1))
                         info['query'] = match.group(2)
@@ -168,6 +270,7 @@ class EnhancedWorkerLogParser:
         }
         
         for line in lines:
+            line = line[:MAX_LINE_LENGTH]
             if "Random topic from list:" in line:
                 match = re.search(r'Random topic from list: (.*?)(?:\||$)', line)
                 if match:
@@ -186,8 +289,9 @@ class EnhancedWorkerLogParser:
         return info
 
     def _extract_search_info(self, lines: List[str]) -> Dict[str, Any]:
-        info = {'videos_found': 0, 'duplicates_removed': 0}
+        info = {'videos_found': 0, 'duplicates_removed': 0, 'search_time': None}
         for line in lines:
+            line = line[:MAX_LINE_LENGTH]
             if "Removed" in line and "duplicate search results" in line:
                 match = re.search(r'Removed (\d+) duplicate', line)
                 if match:
@@ -196,16 +300,34 @@ class EnhancedWorkerLogParser:
                 match = re.search(r'found (\d+) videos', line)
                 if match:
                     info['videos_found'] = int(match.group(1))
+                time_match = re.search(r'Video search took ([\d.]+) s', line)
+                if time_match:
+                    info['search_time'] = float(time_match.group(1))
         return info
 
     def _extract_download_info(self, lines: List[str]) -> Dict[str, Any]:
-        info = {'downloaded_videos': 0, 'download_time': None}
+        info = {'downloaded_videos': 0, 'download_time': None, 'proxy_attempts': {}, 'proxy_downloads': []}
         for line in lines:
+            line = line[:MAX_LINE_LENGTH]
             if "Downloaded and clipped" in line:
                 match = re.search(r'Downloaded and clipped (\d+) videos in ([\d.]+) seconds', line)
                 if match:
                     info['downloaded_videos'] = int(match.group(1))
                     info['download_time'] = float(match.group(2))
+            elif "Using proxy:" in line:
+                match = re.search(r'Using proxy: (\S+)', line)
+                if match:
+                    proxy = proxy_address(match.group(1))
+                    info['proxy_attempts'][proxy] = info['proxy_attempts'].get(proxy, 0) + 1
+            elif "Downloaded video" in line and "Proxy used:" in line:
+                video_match = DOWNLOADED_VIDEO_PATTERN.search(line)
+                proxy_match = video_match and PROXY_USED_PATTERN.search(line, video_match.end())
+                if proxy_match:
+                    info['proxy_downloads'].append({
+                        'video_id': video_match.group(1),
+                        'proxy': proxy_address(proxy_match.group(1)),
+                        'time': float(proxy_match.group(2))
+                    })
         return info
 
     def _extract_processing_info(self, lines: List[str]) -> Dict[str, Any]:
@@ -222,21 +344,22 @@ class EnhancedWorkerLogParser:
         for i, line in enumerate(lines):
             # Track load balancer interaction
             if "Data received from load balancer:" in line:
-                data_size_match = re.search(r'Data received from load balancer: (\d+)', line)
+                data_size_match = re.search(r'Data received from load balancer: (\d+)', line[:MAX_LINE_LENGTH])
                 if data_size_match:
                     info['load_balancer']['data_size'] = int(data_size_match.group(1))
+                    info['load_balancer']['response_time'] = self._seconds_since_previous_line(lines, i)
                     
                     # Look for the response in the next line
                     if i + 1 < len(lines):
                         response_line = lines[i + 1]
                         if "Received response:" in response_line:
                             # Extract video metadata from response
-                            metadata_matches = re.finditer(
-                                r'VideoMetadata\(video_id=\'([^\']+)\', description=\'([^\']+)\', '
-                                r'views=(\d+), start_time=(\d+), end_time=(\d+)',
-                                response_line
-                            )
-                            for match in metadata_matches:
+                            # Response lines can be huge, so match each entry anchored
+                            # instead of scanning the whole line with one regex
+                            for chunk in response_line.split('VideoMetadata(')[1:]:
+                                match = VIDEO_METADATA_PATTERN.match(chunk)
+                                if not match:
+                                    continue
                                 info['load_balancer']['received_metadata'].append({
                                     'video_id': match.group(1),
                                     'description': match.group(2),
@@ -247,7 +370,7 @@ class EnhancedWorkerLogParser:
 
             # Track embedding generation time
             elif "Embeddings generation took" in line:
-                match = re.search(r'took ([\d.]+) s', line)
+                match = re.search(r'took ([\d.]+) s', line[:MAX_LINE_LENGTH])
                 if match:
                     info['embedding_time'] = float(match.group(1))
                 
@@ -256,6 +379,7 @@ class EnhancedWorkerLogParser:
     def _extract_filtering_info(self, lines: List[str]) -> Dict[str, Any]:
         info = {}
         for line in lines:
+            line = line[:MAX_LINE_LENGTH]
             if "unique videos prepared" in line:
                 match = re.search(r'(\d+) unique videos prepared', line)
                 if match:
@@ -274,8 +398,8 @@ class EnhancedWorkerLogParser:
         
         for line in lines:
             # Extract final video list
-            if ". " in line and ": " in line and "[" in line and "]" in line:
-                match = re.search(r'\d+\. ([^:]+): (.*?) \[(\d+\.\.\d+)\] (\d+)', line)
+            if len(line) <= MAX_LINE_LENGTH and ". " in line and ": " in line and "[" in line and "]" in line:
+                match = FINAL_VIDEO_PATTERN.search(line)
                 if match:
                     results['final_videos'].append({
                         'video_id': match.group(1),
@@ -286,7 +410,9 @@ class EnhancedWorkerLogParser:
             
             # Extract scraping status
             elif "SCRAPING" in line:
-                status_match = re.search(r'SCRAPING (SUCCEEDED|FAILED): Scraped (\d+)/(\d+) videos in ([\d.]+)', line)
+                status_match = re.search(
+                    r'SCRAPING (SUCCEEDED|FAILED): Scraped (\d+)/(\d+) videos in ([\d.]+)', line[:MAX_LINE_LENGTH]
+                )
                 if status_match:
                     results['status'] = status_match.group(1)
                     results['delivered_count'] = int(status_match.group(2))
@@ -299,6 +425,7 @@ class EnhancedWorkerLogParser:
         """Extract incentive metrics from log lines."""
         info = {}
         for line in lines:
+            line = line[:MAX_LINE_LENGTH]
             if "Emission/day" in line:
                 self.logger.debug(f"Found incentive line: {line.strip()}")
                 try:
@@ -325,8 +452,13 @@ class EnhancedWorkerLogParser:
 
 def main():
     logging.basicConfig(level=logging.INFO)
+    arg_parser = argparse.ArgumentParser(description='Parse a worker log and print its jobs.')
+    arg_parser.add_argument('log_path', nargs='?', default='example_worker.txt',
+                            help='Worker log (plain, gzip or zstd); use batch_parse.py for many logs')
+    args = arg_parser.parse_args()
+
     parser = EnhancedWorkerLogParser()
-    results = parser.parse_log('example_worker.txt')
+    results = parser.parse_log(args.log_path)
     
     print("\nParsing Results:")
     for job in results['jobs']:
@@ -0,0 +1,239 @@
+import sys
+import math
+import json
+import argparse
+import logging
+from datetime import datetime, timedelta
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Any
+
+from enhanced_worker_log_parser import EnhancedWorkerLogParser, WorkerJob, TIMESTAMP_FORMAT
+
+WINDOWS = {
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400
+}
+LATENCY_FIELDS = ['download_time', 'embedding_time', 'total_time']
+
+
+class QuantileSketch:
+    """Mergeable streaming quantile sketch with bounded relative error.
+
+    Values are counted in logarithmically sized buckets (as in DDSketch), so
+    memory grows with the dynamic range of the data rather than its size.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = defaultdict(int)
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float) -> None:
+        if value is None:
+            return
+        if value <= 1e-9:
+            self.zero_count += 1
+        else:
+            self.buckets[math.ceil(math.log(value) / self.log_gamma)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        for key, count in other.buckets.items():
+            self.buckets[key] += count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Return an estimate of the q-th quantile (0 <= q <= 1)."""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        seen = self.zero_count
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def to_dict(self, quantiles: Iterable[float] = (0.5, 0.9, 0.99)) -> Dict[str, Any]:
+        summary = {'count': self.count, 'mean': self.mean, 'min': self.min, 'max': self.max}
+        for q in quantiles:
+            summary[f'p{int(q * 100)}'] = self.quantile(q)
+        return summary
+
+
+class WindowMetrics:
+    """Counters and latency sketches for one group of jobs."""
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.jobs = 0
+        self.blacklisted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.requested_count = 0
+        self.delivered_count = 0
+        self.incentive_total = 0.0
+        self.incentive_count = 0
+        self.latencies = {name: QuantileSketch(relative_accuracy) for name in LATENCY_FIELDS}
+
+    def add(self, job: WorkerJob) -> None:
+        self.jobs += 1
+        if job.status == 'blacklisted':
+            self.blacklisted += 1
+            return
+        if job.status == 'succeeded':
+            self.succeeded += 1
+        elif job.status == 'failed':
+            self.failed += 1
+
+        for name, value in job_latencies(job).items():
+            self.latencies[name].add(value)
+
+        results = job.results or {}
+        self.requested_count += results.get('requested_count') or 0
+        self.delivered_count += results.get('delivered_count') or 0
+
+        incentive = (job.incentive or {}).get('Incentive')
+        if incentive is not None:
+            self.incentive_total += incentive
+            self.incentive_count += 1
+
+    def merge(self, other: 'WindowMetrics') -> None:
+        for name in ('jobs', 'blacklisted', 'succeeded', 'failed', 'requested_count',
+                     'delivered_count', 'incentive_total', 'incentive_count'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for name, sketch in other.latencies.items():
+            self.latencies[name].merge(sketch)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'jobs': self.jobs,
+            'blacklisted': self.blacklisted,
+            'blacklisted_ratio': self.blacklisted / self.jobs if self.jobs else 0.0,
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'requested_count': self.requested_count,
+            'delivered_count': self.delivered_count,
+            'incentive_total': self.incentive_total,
+            'incentive_mean': self.incentive_total / self.incentive_count if self.incentive_count else None,
+            'latency': {name: sketch.to_dict() for name, sketch in self.latencies.items()}
+        }
+
+
+def job_latencies(job: WorkerJob) -> Dict[str, float]:
+    """Pull the per-job latency fields out of a parsed job."""
+    stages = job.stages or {}
+    values = {
+        'download_time': (stages.get('download') or {}).get('download_time'),
+        'embedding_time': (stages.get('processing') or {}).get('embedding_time'),
+        'total_time': (job.results or {}).get('total_time')
+    }
+    return {name: value for name, value in values.items() if value is not None}
+
+
+def window_start(timestamp: Optional[str], window_seconds: int) -> str:
+    """Floor a log timestamp to the start of its window."""
+    if not timestamp:
+        return 'unknown'
+    try:
+        parsed = datetime.strptime(timestamp, TIMESTAMP_FORMAT)
+    except ValueError:
+        return 'unknown'
+    seconds_into_day = parsed.hour * 3600 + parsed.minute * 60 + parsed.second
+    floored = parsed - timedelta(seconds=seconds_into_day % window_seconds, microseconds=parsed.microsecond)
+    return floored.strftime('%Y-%m-%d %H:%M:%S')
+
+
+class JobMetricsAggregator:
+    """Incrementally roll up a stream of jobs into time windows.
+
+    Only per-window counters and sketches are kept, so weeks of logs can be
+    summarized without holding the jobs themselves.
+    """
+
+    def __init__(self, window: str = 'minute', relative_accuracy: float = 0.01):
+        if window not in WINDOWS:
+            raise ValueError(f"Unknown window '{window}', expected one of {sorted(WINDOWS)}")
+        self.window = window
+        self.window_seconds = WINDOWS[window]
+        self.relative_accuracy = relative_accuracy
+        self.windows: Dict[str, WindowMetrics] = {}
+        self.clients: Dict[str, Dict[str, WindowMetrics]] = defaultdict(dict)
+
+    def _metrics(self, table: Dict[str, WindowMetrics], key: str) -> WindowMetrics:
+        metrics = table.get(key)
+        if metrics is None:
+            metrics = table[key] = WindowMetrics(self.relative_accuracy)
+        return metrics
+
+    def add(self, job: WorkerJob) -> None:
+        key = window_start(job.start_time, self.window_seconds)
+        self._metrics(self.windows, key).add(job)
+        self._metrics(self.clients[key], job.client_hotkey or 'unknown').add(job)
+
+    def consume(self, jobs: Iterable[WorkerJob]) -> 'JobMetricsAggregator':
+        for job in jobs:
+            self.add(job)
+        return self
+
+    def total(self) -> WindowMetrics:
+        """Merge every window into a single summary."""
+        total = WindowMetrics(self.relative_accuracy)
+        for metrics in self.windows.values():
+            total.merge(metrics)
+        return total
+
+    def summarize(self, per_client: bool = True) -> Dict[str, Any]:
+        summary = {
+            'window': self.window,
+            'total': self.total().to_dict(),
+            'windows': []
+        }
+        for key in sorted(self.windows):
+            entry = {'window_start': key, **self.windows[key].to_dict()}
+            if per_client:
+                entry['clients'] = {
+                    hotkey: metrics.to_dict() for hotkey, metrics in sorted(self.clients[key].items())
+                }
+            summary['windows'].append(entry)
+        return summary
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    arg_parser = argparse.ArgumentParser(description='Roll up worker log jobs into time windows.')
+    arg_parser.add_argument('log_paths', nargs='+', help='Worker log files to aggregate')
+    arg_parser.add_argument('--window', choices=sorted(WINDOWS), default='minute')
+    arg_parser.add_argument('--no-clients', action='store_true', help='Omit per client_hotkey breakdown')
+    args = arg_parser.parse_args()
+
+    aggregator = JobMetricsAggregator(window=args.window)
+    for log_path in args.log_paths:
+        aggregator.consume(EnhancedWorkerLogParser().iter_jobs(log_path))
+
+    json.dump(aggregator.summarize(per_client=not args.no_clients), sys.stdout, indent=2)
+    print()
+
+if __name__ == "__main__":
+    main()
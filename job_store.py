@@ -0,0 +1,405 @@
+import json
+import time
+import argparse
+import sqlite3
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from enhanced_worker_log_parser import EnhancedWorkerLogParser, WorkerJob
+from unrecognized_lines import UnrecognizedLineStore
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    digest TEXT UNIQUE,
+    ingested_at TEXT NOT NULL,
+    finished_at TEXT,
+    heartbeat_at TEXT,
+    job_count INTEGER NOT NULL DEFAULT 0,
+    unrecognized TEXT
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    source_id INTEGER NOT NULL REFERENCES sources(id) ON DELETE CASCADE,
+    job_id TEXT NOT NULL,
+    client_hotkey TEXT,
+    status TEXT NOT NULL,
+    start_time TEXT,
+    end_time TEXT,
+    query TEXT,
+    stages TEXT,
+    results TEXT,
+    query_info TEXT,
+    has_incentive INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS final_videos (
+    job_row INTEGER NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    video_id TEXT,
+    title TEXT,
+    clip TEXT,
+    views INTEGER
+);
+CREATE TABLE IF NOT EXISTS received_metadata (
+    job_row INTEGER NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    video_id TEXT,
+    description TEXT,
+    views INTEGER,
+    clip_start INTEGER,
+    clip_end INTEGER
+);
+CREATE TABLE IF NOT EXISTS incentive (
+    job_row INTEGER NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    metric TEXT NOT NULL,
+    value REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_source ON jobs(source_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_start_time ON jobs(start_time);
+CREATE INDEX IF NOT EXISTS idx_jobs_client_hotkey ON jobs(client_hotkey, start_time);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, start_time);
+CREATE INDEX IF NOT EXISTS idx_final_videos_job ON final_videos(job_row);
+CREATE INDEX IF NOT EXISTS idx_final_videos_video_id ON final_videos(video_id);
+CREATE INDEX IF NOT EXISTS idx_received_metadata_job ON received_metadata(job_row);
+CREATE INDEX IF NOT EXISTS idx_received_metadata_video_id ON received_metadata(video_id);
+CREATE INDEX IF NOT EXISTS idx_incentive_job ON incentive(job_row);
+"""
+
+# SQLite's default limit on bound parameters is 999
+FETCH_BATCH_SIZE = 500
+# An unfinished source whose writer hasn't stored a batch for this long is
+# assumed dead (e.g. a killed parse worker) and may be taken over
+STALE_SOURCE_SECONDS = 300
+# How often to check on another writer's ingest of the same file
+SOURCE_POLL_SECONDS = 0.5
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file, used to recognize logs that were already ingested."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _dumps(value: Any) -> Optional[str]:
+    return None if value is None else json.dumps(value)
+
+
+def _loads(value: Optional[str]) -> Any:
+    return None if value is None else json.loads(value)
+
+
+class JobStore:
+    """SQLite store for parsed WorkerJobs.
+
+    Jobs are written in batched transactions; final videos, received
+    metadata and incentive metrics go to their own indexed tables so they can
+    be queried across jobs.
+    """
+
+    def __init__(self, db_path: str):
+        self.logger = logging.getLogger(__name__)
+        self.db_path = db_path
+        # Several parse workers may write at once; wait for the lock instead of failing
+        self.conn = sqlite3.connect(db_path, isolation_level=None, timeout=30)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA foreign_keys=ON')
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute('PRAGMA table_info(sources)')}
+        if 'heartbeat_at' not in columns:
+            # Stores created before ingests kept a heartbeat
+            self.conn.execute('ALTER TABLE sources ADD COLUMN heartbeat_at TEXT')
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> 'JobStore':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def find_source(self, digest: str, finished_only: bool = True) -> Optional[Dict[str, Any]]:
+        """Return the fully ingested source with this digest, or one still being ingested if asked."""
+        row = self.conn.execute(
+            'SELECT id, path, digest, ingested_at, job_count, unrecognized FROM sources '
+            'WHERE digest = ?' + (' AND finished_at IS NOT NULL' if finished_only else ''), (digest,)
+        ).fetchone()
+        return self._source_dict(row) if row else None
+
+    def get_source(self, source_id: int) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute(
+            'SELECT id, path, digest, ingested_at, job_count, unrecognized FROM sources WHERE id = ?', (source_id,)
+        ).fetchone()
+        return self._source_dict(row) if row else None
+
+    def _source_dict(self, row) -> Dict[str, Any]:
+        source_id, path, digest, ingested_at, job_count, unrecognized = row
+        return {
+            'id': source_id, 'path': path, 'digest': digest, 'ingested_at': ingested_at,
+            'job_count': job_count, 'unrecognized': _loads(unrecognized)
+        }
+
+    def ingest(self, jobs: Iterable[WorkerJob], source_path: str, digest: Optional[str] = None,
+               batch_size: int = 1000, unrecognized_lines: Optional[UnrecognizedLineStore] = None) -> int:
+        """Store a stream of jobs under a new source and return the source id.
+
+        The source only counts as finished (and is found by digest) once every
+        job has been written. If the digest is already stored, or is being
+        ingested by another writer, `jobs` isn't consumed: the existing source
+        id is returned, after waiting for an in-flight ingest to finish.
+        """
+        source_id, created = self._claim_source(source_path, digest)
+        if not created:
+            return source_id
+
+        job_count = 0
+        batch = []
+        try:
+            for job in jobs:
+                batch.append(job)
+                if len(batch) >= batch_size:
+                    job_count += self._insert_batch(source_id, batch)
+                    batch = []
+            if batch:
+                job_count += self._insert_batch(source_id, batch)
+        except Exception:
+            # Don't leave a half-ingested source behind to be mistaken for a complete one
+            self.delete_source(source_id)
+            raise
+
+        unrecognized = None
+        if unrecognized_lines is not None:
+            unrecognized = {'lines': unrecognized_lines.to_list(), 'stats': unrecognized_lines.stats()}
+        self.conn.execute(
+            'UPDATE sources SET job_count = ?, unrecognized = ?, finished_at = ? WHERE id = ?',
+            (job_count, _dumps(unrecognized), datetime.now().isoformat(timespec='seconds'), source_id)
+        )
+        self.logger.info(f"Stored {job_count} jobs from {source_path} as source {source_id}")
+        return source_id
+
+    def _claim_source(self, source_path: str, digest: Optional[str]) -> Tuple[int, bool]:
+        """Return (source id, True) for a new source row, or (id, False) for a finished one.
+
+        Waits while another writer is ingesting the same digest, and takes
+        over its row once that writer stops making progress.
+        """
+        waiting_on = None
+        while True:
+            now = datetime.now()
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                existing = None
+                if digest is not None:
+                    existing = self.conn.execute(
+                        'SELECT id, finished_at, COALESCE(heartbeat_at, ingested_at) FROM sources WHERE digest = ?',
+                        (digest,)
+                    ).fetchone()
+                if existing is not None:
+                    source_id, finished_at, heartbeat_at = existing
+                    if finished_at is not None:
+                        self.conn.execute('COMMIT')
+                        return source_id, False
+                    if now - datetime.fromisoformat(heartbeat_at) < timedelta(seconds=STALE_SOURCE_SECONDS):
+                        self.conn.execute('COMMIT')
+                        if waiting_on != source_id:
+                            waiting_on = source_id
+                            self.logger.info(f"{source_path} is being ingested as source {source_id}, waiting for it")
+                        time.sleep(SOURCE_POLL_SECONDS)
+                        continue
+                    self.logger.warning(f"Source {source_id} was abandoned mid-ingest, ingesting {source_path} again")
+                    self.conn.execute('DELETE FROM sources WHERE id = ?', (source_id,))
+                timestamp = now.isoformat(timespec='seconds')
+                cursor = self.conn.execute(
+                    'INSERT INTO sources (path, digest, ingested_at, heartbeat_at) VALUES (?, ?, ?, ?)',
+                    (source_path, digest, timestamp, timestamp)
+                )
+                self.conn.execute('COMMIT')
+                return cursor.lastrowid, True
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+
+    def ingest_log(self, log_path: str) -> int:
+        """Parse a log into the store unless an identical file was ingested before."""
+        digest = file_digest(log_path)
+        source = self.find_source(digest)
+        if source is not None:
+            self.logger.info(f"{log_path} already stored as source {source['id']}")
+            return source['id']
+
+        # The parser is lazy, so nothing is parsed if another writer stores this file first
+        parser = EnhancedWorkerLogParser()
+        return self.ingest(parser.iter_jobs(log_path), log_path, digest, unrecognized_lines=parser.unrecognized_lines)
+
+    def delete_source(self, source_id: int) -> None:
+        self.conn.execute('DELETE FROM sources WHERE id = ?', (source_id,))
+
+    def _insert_batch(self, source_id: int, jobs: List[WorkerJob]) -> int:
+        job_rows, video_rows, metadata_rows, incentive_rows = [], [], [], []
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Every batch refreshes the heartbeat that keeps other writers from taking the source over
+            updated = self.conn.execute(
+                'UPDATE sources SET heartbeat_at = ? WHERE id = ?',
+                (datetime.now().isoformat(timespec='seconds'), source_id)
+            ).rowcount
+            if not updated:
+                raise RuntimeError(f"Source {source_id} was taken over by another writer")
+            # Assign row ids up front so child rows can be bulk inserted too
+            next_row = self.conn.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM jobs').fetchone()[0]
+            for row_id, job in enumerate(jobs, next_row):
+                stages = job.stages
+                if stages and 'processing' in stages:
+                    load_balancer = stages['processing']['load_balancer']
+                    for position, item in enumerate(load_balancer['received_metadata']):
+                        metadata_rows.append((row_id, position, item['video_id'], item['description'],
+                                              item['views'], item['clip_start'], item['clip_end']))
+                    stages = {**stages, 'processing': {
+                        **stages['processing'], 'load_balancer': {**load_balancer, 'received_metadata': []}
+                    }}
+                results = job.results
+                if results is not None:
+                    for position, video in enumerate(results['final_videos']):
+                        video_rows.append((row_id, position, video['video_id'], video['title'],
+                                           video['clip'], video['views']))
+                    results = {**results, 'final_videos': []}
+                for metric, value in (job.incentive or {}).items():
+                    incentive_rows.append((row_id, metric, value))
+                job_rows.append((
+                    row_id, source_id, job.job_id, job.client_hotkey, job.status, job.start_time, job.end_time,
+                    job.query, _dumps(stages), _dumps(results), _dumps(job.query_info), job.incentive is not None
+                ))
+
+            self.conn.executemany(
+                'INSERT INTO jobs (id, source_id, job_id, client_hotkey, status, start_time, end_time, query, '
+                'stages, results, query_info, has_incentive) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', job_rows
+            )
+            self.conn.executemany('INSERT INTO final_videos VALUES (?, ?, ?, ?, ?, ?)', video_rows)
+            self.conn.executemany('INSERT INTO received_metadata VALUES (?, ?, ?, ?, ?, ?, ?)', metadata_rows)
+            self.conn.executemany('INSERT INTO incentive VALUES (?, ?, ?)', incentive_rows)
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+        return len(job_rows)
+
+    def query_jobs(self, source_id: Optional[int] = None, client_hotkey: Optional[str] = None,
+                   status: Optional[str] = None, video_id: Optional[str] = None,
+                   since: Optional[str] = None, until: Optional[str] = None,
+                   limit: Optional[int] = None, offset: int = 0) -> Iterator[WorkerJob]:
+        """Yield stored jobs matching all given filters.
+
+        Jobs of one source come back in the order they were parsed; otherwise
+        they are ordered by start time, with jobs lacking one last.
+        """
+        clauses, params = [], []
+        if source_id is not None:
+            clauses.append('source_id = ?')
+            params.append(source_id)
+        if client_hotkey is not None:
+            clauses.append('client_hotkey = ?')
+            params.append(client_hotkey)
+        if status is not None:
+            clauses.append('status = ?')
+            params.append(status)
+        if since is not None:
+            clauses.append('start_time >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('start_time < ?')
+            params.append(until)
+        if video_id is not None:
+            clauses.append('(id IN (SELECT job_row FROM final_videos WHERE video_id = ?)'
+                           ' OR id IN (SELECT job_row FROM received_metadata WHERE video_id = ?))')
+            params.extend([video_id, video_id])
+
+        sql = ('SELECT id, job_id, client_hotkey, status, start_time, end_time, query, stages, results, '
+               'query_info, has_incentive FROM jobs')
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        if source_id is not None:
+            sql += ' ORDER BY id'
+        else:
+            sql += ' ORDER BY start_time IS NULL, start_time, id'
+        if limit is not None or offset:
+            sql += ' LIMIT ? OFFSET ?'
+            params.extend([-1 if limit is None else limit, offset])
+
+        cursor = self.conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+            if not rows:
+                return
+            yield from self._build_jobs(rows)
+
+    def _children(self, sql: str, row_ids: List[int]) -> Dict[int, List[tuple]]:
+        placeholders = ','.join('?' * len(row_ids))
+        children = defaultdict(list)
+        for row in self.conn.execute(sql.format(placeholders), row_ids):
+            children[row[0]].append(row[1:])
+        return children
+
+    def _build_jobs(self, rows: List[tuple]) -> List[WorkerJob]:
+        row_ids = [row[0] for row in rows]
+        videos = self._children(
+            'SELECT job_row, video_id, title, clip, views FROM final_videos '
+            'WHERE job_row IN ({}) ORDER BY job_row, position', row_ids
+        )
+        metadata = self._children(
+            'SELECT job_row, video_id, description, views, clip_start, clip_end FROM received_metadata '
+            'WHERE job_row IN ({}) ORDER BY job_row, position', row_ids
+        )
+        incentives = self._children('SELECT job_row, metric, value FROM incentive WHERE job_row IN ({})', row_ids)
+
+        jobs = []
+        for (row_id, job_id, client_hotkey, status, start_time, end_time, query, stages, results,
+             query_info, has_incentive) in rows:
+            stages = _loads(stages)
+            if stages and 'processing' in stages:
+                stages['processing']['load_balancer']['received_metadata'] = [
+                    {'video_id': video_id, 'description': description, 'views': views,
+                     'clip_start': clip_start, 'clip_end': clip_end}
+                    for video_id, description, views, clip_start, clip_end in metadata.get(row_id, [])
+                ]
+            results = _loads(results)
+            if results is not None:
+                results['final_videos'] = [
+                    {'video_id': video_id, 'title': title, 'clip': clip, 'views': views}
+                    for video_id, title, clip, views in videos.get(row_id, [])
+                ]
+            jobs.append(WorkerJob(
+                job_id=job_id,
+                query=query,
+                client_hotkey=client_hotkey,
+                stages=stages,
+                results=results,
+                start_time=start_time,
+                end_time=end_time,
+                status=status,
+                incentive=dict(incentives.get(row_id, [])) if has_incentive else None,
+                query_info=_loads(query_info)
+            ))
+        return jobs
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    arg_parser = argparse.ArgumentParser(description='Parse worker logs into a SQLite job store.')
+    arg_parser.add_argument('db_path', help='SQLite database to create or update')
+    arg_parser.add_argument('log_paths', nargs='+', help='Worker logs to ingest')
+    args = arg_parser.parse_args()
+
+    with JobStore(args.db_path) as store:
+        for log_path in args.log_paths:
+            store.ingest_log(log_path)
+
+if __name__ == "__main__":
+    main()
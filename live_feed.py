@@ -0,0 +1,217 @@
+import os
+import json
+import queue
+import logging
+import threading
+from collections import deque
+from dataclasses import asdict
+from typing import Any, Dict, Iterator, Optional, Set
+
+from enhanced_worker_log_parser import EnhancedWorkerLogParser, WorkerJob
+
+# First line of every job in a worker log
+JOB_START_MARKER = 'Incoming request: UID'
+
+
+class FeedFull(Exception):
+    """Raised when a feed already has as many subscribers as it allows."""
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Encode one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class LogFollower:
+    """Yield lines appended to a log file, reopening it when it is rotated (like tail -F).
+
+    When following from the end, lines before the first one containing
+    ``start_marker`` (if given) are dropped, so reading doesn't begin
+    halfway through a record.
+    """
+
+    def __init__(self, log_path: str, poll_interval: float = 0.5, from_start: bool = False,
+                 start_marker: Optional[str] = None):
+        self.log_path = log_path
+        self.poll_interval = poll_interval
+        self.from_start = from_start
+        self.start_marker = start_marker
+
+    def follow(self, stop: threading.Event) -> Iterator[Optional[str]]:
+        """Yield new lines, or None whenever the file has nothing new to read.
+
+        After a rotation the old file is read to the end before lines from its
+        replacement are yielded, so the two read as one continuous stream.
+        """
+        f = None
+        inode = None
+        partial = b''
+        seek_to_end = not self.from_start
+        skipping = seek_to_end and self.start_marker is not None
+        try:
+            while not stop.is_set():
+                if f is None:
+                    try:
+                        f = open(self.log_path, 'rb')
+                    except FileNotFoundError:
+                        yield None
+                        stop.wait(self.poll_interval)
+                        continue
+                    inode = os.fstat(f.fileno()).st_ino
+                    if seek_to_end:
+                        f.seek(0, os.SEEK_END)
+                    # Files that appear after a rotation are read from the start
+                    seek_to_end = False
+
+                line = f.readline()
+                if line:
+                    if not line.endswith(b'\n'):
+                        # The writer hasn't finished this line yet
+                        partial += line
+                        continue
+                    text = (partial + line).decode('utf-8', errors='replace')
+                    partial = b''
+                    if skipping:
+                        if self.start_marker not in text:
+                            continue
+                        skipping = False
+                    yield text
+                    continue
+
+                try:
+                    stat = os.stat(self.log_path)
+                except FileNotFoundError:
+                    stat = None
+                if stat is None or stat.st_ino != inode or stat.st_size < f.tell():
+                    f.close()
+                    f = None
+                    partial = b''
+                    continue
+                yield None
+                stop.wait(self.poll_interval)
+        finally:
+            if f is not None:
+                f.close()
+
+
+class LiveJobFeed:
+    """Tail one worker log and fan completed jobs out to many subscribers.
+
+    A single reader thread parses the log incrementally; each subscriber gets
+    its own bounded queue of pre-encoded SSE messages. A subscriber that falls
+    behind loses its oldest messages rather than slowing the reader down.
+    Each subscriber holds a server thread while it is connected, so at most
+    ``max_subscribers`` are allowed at once.
+    A job is only known to be complete once the next request starts, so the
+    newest job is published when the following one arrives. Lines from a
+    rotated-in file go through the same parser, as the job in progress
+    usually continues there.
+    """
+
+    def __init__(self, log_path: str, history: int = 200, max_queue: int = 100, poll_interval: float = 0.5,
+                 max_subscribers: int = 4):
+        self.logger = logging.getLogger(__name__)
+        # Tailing starts mid-job; the partial job before the first request is skipped
+        self.follower = LogFollower(log_path, poll_interval, start_marker=JOB_START_MARKER)
+        self.max_queue = max_queue
+        self.max_subscribers = max_subscribers
+        self.recent_jobs = deque(maxlen=history)
+        self.totals = {'jobs': 0, 'succeeded': 0, 'failed': 0, 'blacklisted': 0, 'incentive_total': 0.0}
+        self._subscribers: Set[queue.Queue] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='live-job-feed', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def subscribe(self) -> queue.Queue:
+        """Return a new subscriber queue, or raise FeedFull if there are too many."""
+        events: queue.Queue = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise FeedFull(f"All {self.max_subscribers} live feed slots are in use")
+            self._subscribers.add(events)
+        self.start()
+        return events
+
+    def unsubscribe(self, events: queue.Queue) -> None:
+        with self._lock:
+            self._subscribers.discard(events)
+
+    def _run(self) -> None:
+        parser = EnhancedWorkerLogParser()
+        try:
+            for line in self.follower.follow(self._stop):
+                if line is None:
+                    continue
+                job = parser.feed_line(line)
+                if job is not None:
+                    self._publish(job)
+        except Exception as e:
+            self.logger.error(f"Live feed reader stopped: {e}", exc_info=True)
+
+    def _publish(self, job: WorkerJob) -> None:
+        with self._lock:
+            self._record(job)
+            message = format_sse('job', {'job': asdict(job), 'stats': self._stats()})
+            subscribers = list(self._subscribers)
+        for events in subscribers:
+            while True:
+                try:
+                    events.put_nowait(message)
+                    break
+                except queue.Full:
+                    try:
+                        events.get_nowait()
+                    except queue.Empty:
+                        pass
+
+    def _record(self, job: WorkerJob) -> None:
+        incentive = (job.incentive or {}).get('Incentive') or 0.0
+        self.recent_jobs.append((job.status, incentive))
+        self.totals['jobs'] += 1
+        if job.status in self.totals:
+            self.totals[job.status] += 1
+        self.totals['incentive_total'] += incentive
+
+    def _stats(self) -> Dict[str, Any]:
+        recent = len(self.recent_jobs)
+        statuses = [status for status, _ in self.recent_jobs]
+        return {
+            'totals': dict(self.totals),
+            'recent': {
+                'jobs': recent,
+                'success_rate': statuses.count('succeeded') / recent if recent else None,
+                'blacklist_rate': statuses.count('blacklisted') / recent if recent else None,
+                'incentive_mean': sum(i for _, i in self.recent_jobs) / recent if recent else None
+            }
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Totals since the feed started plus rates over the most recent jobs."""
+        with self._lock:
+            return self._stats()
+
+
+_feeds: Dict[str, LiveJobFeed] = {}
+_feeds_lock = threading.Lock()
+
+
+def get_live_feed(log_path: str, max_subscribers: int = 4) -> LiveJobFeed:
+    """Return the shared feed for a log, so all clients use one reader."""
+    with _feeds_lock:
+        feed = _feeds.get(log_path)
+        if feed is None:
+            feed = _feeds[log_path] = LiveJobFeed(log_path, max_subscribers=max_subscribers)
+        return feed
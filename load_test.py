@@ -0,0 +1,299 @@
+import io
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import argparse
+import logging
+import tempfile
+import threading
+import tracemalloc
+import multiprocessing
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, List, Optional
+
+from synthetic_logs import generate_log_lines
+
+# Relative increase over the baseline that counts as a regression
+DEFAULT_TOLERANCE = 0.25
+REGRESSION_METRICS = ['p50', 'p99', 'peak_rss_mb']
+RESULT_HEADER = (
+    f"{'jobs':>7}{'MB':>7}{'conc':>6}{'ok':>6}{'503':>6}{'err':>6}{'req/s':>9}{'MB/s':>8}"
+    f"{'p50 s':>9}{'p99 s':>9}{'max s':>9}{'heap MB':>9}{'RSS MB':>9}"
+)
+
+
+@dataclass
+class ScenarioResult:
+    jobs_per_log: int
+    log_bytes: int
+    concurrency: int
+    requests: int
+    ok: int
+    rejected: int
+    errors: int
+    duration: float
+    throughput: float
+    mb_per_second: float
+    p50: Optional[float]
+    p99: Optional[float]
+    max: Optional[float]
+    peak_traced_mb: Optional[float] = None
+    peak_rss_mb: Optional[float] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.jobs_per_log}x{self.concurrency}"
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of a list of latencies."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+def _rss_mb(pid) -> Optional[float]:
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+class RssSampler:
+    """Track peak resident memory of this process plus its parse workers.
+
+    Reads /proc, so it only reports on Linux; elsewhere peak is None.
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            sizes = [_rss_mb('self')] + [_rss_mb(p.pid) for p in multiprocessing.active_children()]
+            sizes = [s for s in sizes if s is not None]
+            if sizes:
+                self.peak = max(self.peak or 0.0, sum(sizes))
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> 'RssSampler':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def unique_payload(base: bytes, n: int) -> bytes:
+    # Identical uploads are answered from the store, so make every request distinct
+    return base + f"load-test request {n} {uuid.uuid4().hex}\n".encode()
+
+
+def flask_client_upload() -> Callable[[str, bytes], int]:
+    from app import app
+    local = threading.local()
+
+    def upload(filename: str, payload: bytes) -> int:
+        # Flask test clients aren't shared between threads
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        response = local.client.post('/upload', data={'file': (io.BytesIO(payload), filename)},
+                                     content_type='multipart/form-data')
+        response.get_data()
+        return response.status_code
+
+    return upload
+
+
+def http_upload(base_url: str) -> Callable[[str, bytes], int]:
+    url = base_url.rstrip('/') + '/upload'
+
+    def upload(filename: str, payload: bytes) -> int:
+        boundary = uuid.uuid4().hex
+        body = (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'
+        ).encode() + payload + f'\r\n--{boundary}--\r\n'.encode()
+        request = urllib.request.Request(
+            url, data=body, headers={'Content-Type': f'multipart/form-data; boundary={boundary}'}
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+    return upload
+
+
+def run_scenario(upload: Callable[[str, bytes], int], base: bytes, jobs_per_log: int,
+                 concurrency: int, requests: int, measure_memory: bool) -> ScenarioResult:
+    """Send `requests` uploads with `concurrency` in flight and time each one."""
+    latencies: List[float] = []
+    statuses: List[int] = []
+    lock = threading.Lock()
+
+    def one(n: int) -> None:
+        payload = unique_payload(base, n)
+        started = time.perf_counter()
+        try:
+            status = upload(f'load_{jobs_per_log}_{n}.log', payload)
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Request {n} failed: {e}")
+            status = 0
+        elapsed = time.perf_counter() - started
+        with lock:
+            statuses.append(status)
+            if status == 200:
+                latencies.append(elapsed)
+
+    if measure_memory:
+        tracemalloc.start()
+    with RssSampler() as sampler:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(one, range(requests)))
+        duration = time.perf_counter() - started
+    peak_traced = None
+    if measure_memory:
+        peak_traced = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+
+    ok = statuses.count(200)
+    rejected = statuses.count(503)
+    return ScenarioResult(
+        jobs_per_log=jobs_per_log,
+        log_bytes=len(base),
+        concurrency=concurrency,
+        requests=requests,
+        ok=ok,
+        rejected=rejected,
+        errors=len(statuses) - ok - rejected,
+        duration=duration,
+        throughput=ok / duration if duration else 0.0,
+        mb_per_second=ok * len(base) / 1e6 / duration if duration else 0.0,
+        p50=percentile(latencies, 0.5),
+        p99=percentile(latencies, 0.99),
+        max=max(latencies) if latencies else None,
+        peak_traced_mb=peak_traced,
+        peak_rss_mb=sampler.peak if measure_memory else None
+    )
+
+
+def compare_to_baseline(results: List[ScenarioResult], baseline: List[Dict[str, Any]],
+                        tolerance: float) -> List[str]:
+    """Describe every metric that got worse than the baseline by more than `tolerance`."""
+    previous = {f"{b['jobs_per_log']}x{b['concurrency']}": b for b in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get(result.key)
+        if old is None:
+            continue
+        for metric in REGRESSION_METRICS:
+            new_value, old_value = getattr(result, metric), old.get(metric)
+            if new_value is None or not old_value:
+                continue
+            if new_value > old_value * (1 + tolerance):
+                regressions.append(
+                    f"{result.key} {metric}: {old_value:.3f} -> {new_value:.3f} (+{new_value / old_value - 1:.0%})"
+                )
+        if result.errors > old.get('errors', 0):
+            regressions.append(f"{result.key} errors: {old.get('errors', 0)} -> {result.errors}")
+    return regressions
+
+
+def format_result(r: ScenarioResult) -> str:
+    def fmt(value, spec='.3f'):
+        return '-' if value is None else format(value, spec)
+
+    return (
+        f"{r.jobs_per_log:>7}{r.log_bytes / 1e6:>7.1f}{r.concurrency:>6}{r.ok:>6}{r.rejected:>6}{r.errors:>6}"
+        f"{r.throughput:>9.2f}{r.mb_per_second:>8.1f}{fmt(r.p50):>9}{fmt(r.p99):>9}{fmt(r.max):>9}"
+        f"{fmt(r.peak_traced_mb, '.1f'):>9}{fmt(r.peak_rss_mb, '.0f'):>9}"
+    )
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(',') if v]
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    arg_parser = argparse.ArgumentParser(description='Load-test POST /upload with synthetic worker logs.')
+    arg_parser.add_argument('--sizes', type=_int_list, default=[50, 500, 2000],
+                            help='Comma-separated jobs per synthetic log')
+    arg_parser.add_argument('--concurrency', type=_int_list, default=[1, 4, 16],
+                            help='Comma-separated numbers of uploads in flight')
+    arg_parser.add_argument('--requests', type=int, default=32, help='Uploads per scenario')
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--url', help='Test a running server (e.g. http://localhost:5000) '
+                                          'instead of the in-process app; memory is not measured')
+    arg_parser.add_argument('--workers', type=int, help='PARSE_WORKERS for the in-process app')
+    arg_parser.add_argument('--queue', type=int, help='PARSE_QUEUE for the in-process app')
+    arg_parser.add_argument('--output', help='Write results as JSON, e.g. to keep as a baseline')
+    arg_parser.add_argument('--baseline', help='JSON results from an earlier run to compare against')
+    arg_parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                            help='Allowed relative slowdown before a metric counts as a regression')
+    args = arg_parser.parse_args()
+
+    workdir = None
+    if args.url:
+        upload = http_upload(args.url)
+    else:
+        # Keep the store and uploads of the run away from the real ones
+        workdir = tempfile.mkdtemp(prefix='load_test_')
+        os.environ['JOB_STORE'] = os.path.join(workdir, 'jobs.db')
+        from app import app
+        app.config['JOB_STORE'] = os.environ['JOB_STORE']
+        app.config['UPLOAD_FOLDER'] = os.path.join(workdir, 'uploads')
+        os.makedirs(app.config['UPLOAD_FOLDER'])
+        if args.workers:
+            app.config['PARSE_WORKERS'] = args.workers
+        if args.queue:
+            app.config['PARSE_QUEUE'] = args.queue
+        upload = flask_client_upload()
+
+    results = []
+    print(RESULT_HEADER, flush=True)
+    try:
+        for jobs in args.sizes:
+            base = ''.join(generate_log_lines(jobs, seed=args.seed)).encode()
+            for concurrency in args.concurrency:
+                result = run_scenario(upload, base, jobs, concurrency, args.requests, measure_memory=not args.url)
+                results.append(result)
+                print(format_result(result), flush=True)
+    finally:
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump([asdict(r) for r in results], f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+        if regressions:
+            print('\nRegressions against ' + args.baseline + ':\n  ' + '\n  '.join(regressions))
+            sys.exit(1)
+        print(f'\nNo regressions against {args.baseline}')
+
+if __name__ == "__main__":
+    main()
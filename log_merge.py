@@ -0,0 +1,149 @@
+import re
+import sys
+import json
+import heapq
+import queue
+import argparse
+import logging
+import threading
+from dataclasses import asdict
+from operator import itemgetter
+from collections import defaultdict
+from typing import Iterator, List, Tuple
+
+from enhanced_worker_log_parser import EnhancedWorkerLogParser, WorkerJob
+from log_reader import TIMESTAMP_PATTERN, open_log
+
+_DONE = object()
+# worker.log.2.gz, worker.log.1, worker.log -> worker.log
+ROTATION_SUFFIX = re.compile(r'(?:\.(\d+))?(?:\.gz|\.zst)?$')
+
+
+def _read_batches(log_path: str, batches: queue.Queue, stop: threading.Event, batch_size: int) -> None:
+    """Decompress a log in a background thread and hand lines over in batches."""
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        with open_log(log_path) as f:
+            batch = []
+            for line in f:
+                batch.append(line)
+                if len(batch) >= batch_size:
+                    if not put(batch):
+                        return
+                    batch = []
+            if batch:
+                put(batch)
+    except Exception as e:
+        put(e)
+    finally:
+        put(_DONE)
+
+
+def iter_prefetched_lines(log_path: str, batch_size: int = 1000, max_batches: int = 16) -> Iterator[str]:
+    """Yield lines of a (possibly compressed) log read ahead by a worker thread."""
+    batches: queue.Queue = queue.Queue(maxsize=max_batches)
+    stop = threading.Event()
+    reader = threading.Thread(
+        target=_read_batches, args=(log_path, batches, stop, batch_size),
+        name=f'log-reader:{log_path}', daemon=True
+    )
+    reader.start()
+    try:
+        while True:
+            item = batches.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield from item
+    finally:
+        stop.set()
+
+
+def _with_sort_keys(jobs: Iterator[WorkerJob]) -> Iterator[Tuple[str, WorkerJob]]:
+    """Pair jobs with their start time, carrying the last one forward for jobs without one."""
+    last_start = ''
+    for job in jobs:
+        last_start = job.start_time or last_start
+        yield last_start, job
+
+
+def first_timestamp(log_path: str, max_lines: int = 1000) -> str:
+    """Timestamp of the first timestamped line, or '' if none is found early on."""
+    with open_log(log_path) as f:
+        for line_number, line in enumerate(f):
+            match = TIMESTAMP_PATTERN.search(line)
+            if match:
+                return match.group(1)
+            if line_number >= max_lines:
+                break
+    return ''
+
+
+def group_rotations(log_paths: List[str]) -> List[List[str]]:
+    """Group rotated files of the same log, each group ordered oldest first."""
+    groups = defaultdict(list)
+    for log_path in log_paths:
+        groups[ROTATION_SUFFIX.sub('', log_path, count=1)].append(log_path)
+
+    def age_key(log_path: str):
+        # Higher rotation numbers are older when timestamps don't decide
+        number = ROTATION_SUFFIX.search(log_path).group(1)
+        return first_timestamp(log_path), -int(number or 0)
+
+    return [sorted(paths, key=age_key) for _, paths in sorted(groups.items())]
+
+
+def iter_chained_lines(log_paths: List[str], batch_size: int = 1000) -> Iterator[str]:
+    """Lines of several files in order, as if they were one log."""
+    for log_path in log_paths:
+        yield from iter_prefetched_lines(log_path, batch_size)
+
+
+def iter_merged_jobs(log_paths: List[str], batch_size: int = 1000) -> Iterator[WorkerJob]:
+    """K-way merge the jobs of several logs into one stream ordered by start time.
+
+    Rotated files of one log (worker.log.1.gz, worker.log) are chained
+    through a single parser, so a job cut by a rotation stays whole; only
+    different logs get separate streams. Every file is decompressed by its
+    own reader thread; the merge itself only holds one pending job per log.
+    A job without a start time keeps its place after the job before it.
+    """
+    streams = [
+        _with_sort_keys(EnhancedWorkerLogParser().iter_jobs_from_lines(iter_chained_lines(paths, batch_size)))
+        for paths in group_rotations(log_paths)
+    ]
+    for job_number, (_, job) in enumerate(heapq.merge(*streams, key=itemgetter(0))):
+        # Per-log parsers number their jobs independently
+        job.job_id = str(job_number)
+        yield job
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    arg_parser = argparse.ArgumentParser(description='Merge several worker logs into one job stream.')
+    arg_parser.add_argument('log_paths', nargs='+', help='Plain, gzip or zstd worker logs')
+    arg_parser.add_argument('-o', '--output', help='Write JSON lines here instead of stdout')
+    args = arg_parser.parse_args()
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        count = 0
+        for job in iter_merged_jobs(args.log_paths):
+            out.write(json.dumps(asdict(job)) + '\n')
+            count += 1
+    finally:
+        if args.output:
+            out.close()
+    logging.getLogger(__name__).info(f"Merged {count} jobs from {len(args.log_paths)} logs")
+
+if __name__ == "__main__":
+    main()
@@ -10,13 +10,20 @@ class LogPattern:
     example: str
     category: str
 
-# Define all known log patterns
+# Define all known log patterns.
+# They are used with search() on whole lines, so leading/trailing .* adds
+# nothing but backtracking; between tokens, prefer \S+ or a negated class.
+# A lazy gap like .*? (or [^\n]*?) is retried from every start position and
+# goes quadratic on long lines.
+
+# A Python repr'd string: '...' or "..." with backslash escapes
+QUOTED = r"""(?:'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")"""
 REQUEST_PATTERNS = {
     'request_start': LogPattern(
         name='request_start',
         patterns=[
-            r'\[34m.*\[39m \| \[36m\[1m     TRACE      \[0m \| axon     \| <-- \| \d+ B \| Videos \|',
-            r'Incoming request: UID \d+ - HK .* - timeout .* - stake \d+'
+            r'\[34m[^|]*\[39m \| \[36m\[1m     TRACE      \[0m \| axon     \| <-- \| \d+ B \| Videos \|',
+            r'Incoming request: UID \d+ - HK \S+ - timeout [\d.]+ s - stake \d+'
         ],
         priority=1,
         example='[34m2024-06-18 14:29:55.647[0m | [36m[1m     TRACE      [0m | axon     | <-- | 875 B | Videos |',
@@ -26,7 +33,7 @@ REQUEST_PATTERNS = {
         name='blacklist_check',
         patterns=[
             r'(?:Not )?Blacklisting (?:recognized )?hotkey',
-            r'Blacklisted: (?:True|False)(?:, .*)?'
+            r'Blacklisted: (?:True|False)'
         ],
         priority=2,
         example='Not Blacklisting recognized hotkey 5HK5...',
@@ -35,8 +42,8 @@ REQUEST_PATTERNS = {
     'query_info': LogPattern(
         name='query_info',
         patterns=[
-            r'Received scraping request: \d+ videos for query \'.*\'',
-            r'Random topic from list: .*',
+            r'Received scraping request: \d+ videos for query \'',
+            r'Random topic from list: ',
             r'Parallel requests: \d+ from validator\(s\)'
         ],
         priority=3,
@@ -50,8 +57,8 @@ VIDEO_SEARCH_PATTERNS = {
         name='search_results',
         patterns=[
             r'Removed \d+ duplicate search results',
-            r'Query .* \+\d+ \| \d+ videos',
-            r'Video search took .* s: found \d+ videos'
+            r'Query [^|]* \+\d+ \| \d+ videos',
+            r'Video search took [\d.]+ s: found \d+ videos'
         ],
         priority=4,
         example='Removed 61 duplicate search results.',
@@ -60,7 +67,7 @@ VIDEO_SEARCH_PATTERNS = {
     'video_details': LogPattern(
         name='video_details',
         patterns=[
-            r'video_id=\'.*\' title=\'.*\' description=.*length=\d+ views=\d+'
+            rf'video_id=\'[\w-]+\' title={QUOTED} description=(?:None|{QUOTED}) length=\d+ views=\d+'
         ],
         priority=5,
         example='video_id=\'bGo5OOTnmvw\' title=\'Example\' description=None length=495 views=95851',
@@ -82,8 +89,8 @@ DOWNLOAD_PATTERNS = {
     'proxy_usage': LogPattern(
         name='proxy_usage',
         patterns=[
-            r'Using proxy: .*:\d+',
-            r'Downloaded video .* Proxy used: .* \(\d+\.\d+\)'
+            r'Using proxy: \S+:\d+',
+            r'Downloaded video \S+ in [\d.]+ s\. Proxy used: \S+ \(\d+\.\d+\)'
         ],
         priority=7,
         example='Using proxy: va2av:WHxvzmjnoK@93.189.230.241:50100',
@@ -95,9 +102,9 @@ ERROR_PATTERNS = {
     'error': LogPattern(
         name='error',
         patterns=[
-            r'\[31m\[1m     ERROR      \[0m \|.*',
-            r'Error:.*',
-            r'Exception:.*'
+            r'\[31m\[1m     ERROR      \[0m \|',
+            r'Error:',
+            r'Exception:'
         ],
         priority=1,
         example='[31m[1m     ERROR      [0m | BlacklistedException: Forbidden',
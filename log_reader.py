@@ -0,0 +1,206 @@
+import io
+import os
+import re
+import gzip
+import json
+import bisect
+import argparse
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import IO, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+def detect_compression(path: str) -> str:
+    """Return 'gzip', 'zstd' or 'plain' based on the file's magic bytes."""
+    with open(path, 'rb') as f:
+        head = f.read(4)
+    if head.startswith(GZIP_MAGIC):
+        return 'gzip'
+    if head.startswith(ZSTD_MAGIC):
+        return 'zstd'
+    return 'plain'
+
+
+def open_log(path: str, encoding: str = 'utf-8', errors: str = 'strict') -> IO[str]:
+    """Open a plain, gzip or zstd log file as a text stream.
+
+    Compressed files are decompressed on the fly while iterating, so nothing
+    is inflated into memory up front.
+    """
+    compression = detect_compression(path)
+    if compression == 'gzip':
+        return gzip.open(path, 'rt', encoding=encoding, errors=errors)
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("Reading zstd compressed logs requires the 'zstandard' package")
+        raw = open(path, 'rb')
+        reader = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+        return io.TextIOWrapper(io.BufferedReader(reader), encoding=encoding, errors=errors)
+    return open(path, 'r', encoding=encoding, errors=errors)
+
+
+# Block-indexed logs
+#
+# A block-indexed log is an ordinary gzip or zstd file written as a sequence of
+# independently compressed blocks (gzip members / zstd frames), each holding
+# whole lines. Standard tools still read it as one stream, while the sidecar
+# index ("<path>.idx") lets us seek to a line or decompress blocks in parallel.
+
+INDEX_SUFFIX = '.idx'
+TIMESTAMP_PATTERN = re.compile(r'\[34m(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d{3})')
+
+
+@dataclass
+class LogBlock:
+    offset: int
+    length: int
+    first_line: int
+    line_count: int
+    first_timestamp: Optional[str] = None
+
+
+def _compress_block(data: bytes, codec: str) -> bytes:
+    if codec == 'gzip':
+        return gzip.compress(data)
+    if codec == 'zstd':
+        import zstandard
+        return zstandard.ZstdCompressor().compress(data)
+    raise ValueError(f"Unknown codec '{codec}', expected 'gzip' or 'zstd'")
+
+
+def _decompress_block(data: bytes, codec: str) -> bytes:
+    if codec == 'gzip':
+        return gzip.decompress(data)
+    import zstandard
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+def write_block_indexed(src_path: str, dst_path: str, codec: str = 'gzip', block_lines: int = 10000) -> List[LogBlock]:
+    """Compress a log into independently decompressible blocks and write its index."""
+    blocks = []
+    offset = 0
+    line_number = 1
+
+    def flush(out: IO[bytes], lines: List[str]) -> None:
+        nonlocal offset, line_number
+        data = _compress_block(''.join(lines).encode('utf-8'), codec)
+        out.write(data)
+        first_timestamp = None
+        for line in lines:
+            match = TIMESTAMP_PATTERN.search(line)
+            if match:
+                first_timestamp = match.group(1)
+                break
+        blocks.append(LogBlock(offset, len(data), line_number, len(lines), first_timestamp))
+        offset += len(data)
+        line_number += len(lines)
+
+    with open_log(src_path) as src, open(dst_path, 'wb') as out:
+        lines = []
+        for line in src:
+            lines.append(line)
+            if len(lines) >= block_lines:
+                flush(out, lines)
+                lines = []
+        if lines:
+            flush(out, lines)
+
+    # The archive's size and mtime are kept so a replaced archive isn't read through a stale index
+    stat = os.stat(dst_path)
+    with open(dst_path + INDEX_SUFFIX, 'w', encoding='utf-8') as f:
+        json.dump({
+            'codec': codec, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+            'blocks': [asdict(block) for block in blocks]
+        }, f)
+    return blocks
+
+
+def load_block_index(path: str) -> Optional[Tuple[str, List[LogBlock]]]:
+    """Return (codec, blocks) for a block-indexed log.
+
+    Returns None if it has no index, or if the index doesn't match the file
+    (it was rewritten, recompressed or truncated since the index was made).
+    """
+    index_path = path + INDEX_SUFFIX
+    if not os.path.exists(index_path):
+        return None
+    with open(index_path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    stat = os.stat(path)
+    if index.get('size') != stat.st_size or index.get('mtime_ns') != stat.st_mtime_ns:
+        logger.warning(f"Ignoring stale block index {index_path}")
+        return None
+    return index['codec'], [LogBlock(**block) for block in index['blocks']]
+
+
+def read_block(path: str, block: LogBlock, codec: str, encoding: str = 'utf-8') -> List[str]:
+    """Seek to a single block and return its decompressed lines."""
+    with open(path, 'rb') as f:
+        f.seek(block.offset)
+        data = f.read(block.length)
+    return io.StringIO(_decompress_block(data, codec).decode(encoding), newline=None).readlines()
+
+
+def iter_block_lines(path: str, start_line: int = 1, max_workers: int = 4, encoding: str = 'utf-8',
+                     index: Optional[Tuple[str, List[LogBlock]]] = None) -> Iterator[str]:
+    """Yield lines of a block-indexed log from start_line on.
+
+    Blocks are decompressed ahead of the consumer by a thread pool, with at
+    most 2 * max_workers blocks in flight.
+    """
+    index = index or load_block_index(path)
+    if index is None:
+        raise ValueError(f"{path} has no valid block index")
+    codec, blocks = index
+    first = max(bisect.bisect_right([block.first_line for block in blocks], start_line) - 1, 0)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        remaining = iter(blocks[first:])
+        for block in remaining:
+            pending.append(executor.submit(read_block, path, block, codec, encoding))
+            if len(pending) >= 2 * max_workers:
+                break
+        skip = start_line - blocks[first].first_line if blocks else 0
+        while pending:
+            lines = pending.popleft().result()
+            next_block = next(remaining, None)
+            if next_block is not None:
+                pending.append(executor.submit(read_block, path, next_block, codec, encoding))
+            if skip > 0:
+                lines = lines[skip:]
+                skip = 0
+            yield from lines
+
+
+def iter_log_lines(path: str, encoding: str = 'utf-8') -> Iterator[str]:
+    """Yield the lines of any supported log, using parallel blocks when indexed."""
+    index = load_block_index(path)
+    if index is not None:
+        yield from iter_block_lines(path, encoding=encoding, index=index)
+        return
+    with open_log(path, encoding=encoding) as f:
+        yield from f
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Write a block-indexed compressed copy of a log.')
+    arg_parser.add_argument('src_path', help='Log to compress (plain, gzip or zstd)')
+    arg_parser.add_argument('dst_path', help='Compressed output; the index is written next to it')
+    arg_parser.add_argument('--codec', choices=['gzip', 'zstd'], default='gzip')
+    arg_parser.add_argument('--block-lines', type=int, default=10000)
+    args = arg_parser.parse_args()
+
+    blocks = write_block_indexed(args.src_path, args.dst_path, args.codec, args.block_lines)
+    print(f"Wrote {len(blocks)} blocks to {args.dst_path} (index: {args.dst_path}{INDEX_SUFFIX})")
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,8 @@ from typing import List, Optional
 import logging
 import os
 
+from log_reader import open_log
+
 @dataclass
 class Task:
     timestamp: datetime
@@ -19,7 +21,7 @@ def parse_client_log(client_log_path: str, worker_id: int) -> List[Task]:
     
     logger.info(f"Worker ID to look for: {worker_id}")
     
-    with open(client_log_path, 'r', encoding='utf-8') as f:
+    with open_log(client_log_path) as f:
         for line_num, line in enumerate(f, 1):
             # Print first few lines to debug
             if line_num <= 5:
@@ -63,7 +65,7 @@ def parse_worker_log(worker_log_path: str, client_id: int) -> List[Task]:
     """Parse worker log to find responses to specific client."""
     tasks = []
     
-    with open(worker_log_path, 'r', encoding='utf-8') as f:
+    with open_log(worker_log_path) as f:
         content = f.read()
         # Print first 200 chars to debug
         logger.debug(f"First 200 chars of worker log:\n{content[:200]}")
@@ -0,0 +1,75 @@
+import os
+import atexit
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional
+
+from job_store import JobStore
+
+
+class PoolBusy(Exception):
+    """Raised when every parse slot is taken and the caller should retry later."""
+
+
+def ingest_log_file(db_path: str, log_path: str) -> int:
+    """Parse a log into the job store; runs inside a pool worker process."""
+    with JobStore(db_path) as store:
+        return store.ingest_log(log_path)
+
+
+class ParsePool:
+    """Process pool shared by all request threads for parsing uploads.
+
+    At most ``max_pending`` parses may be running or queued at once; further
+    submissions wait up to ``admission_timeout`` seconds for a slot and then
+    fail with PoolBusy, so a burst of large uploads is pushed back to clients
+    instead of piling up in memory.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_pending: Optional[int] = None,
+                 admission_timeout: float = 0.0):
+        self.logger = logging.getLogger(__name__)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 2 * self.max_workers
+        self.admission_timeout = admission_timeout
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        # Workers are spawned rather than forked because the web server is multithreaded
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn')
+        )
+
+    def submit(self, db_path: str, log_path: str) -> Future:
+        """Queue a log for parsing, or raise PoolBusy if the pool is saturated."""
+        if self.admission_timeout > 0:
+            acquired = self._slots.acquire(timeout=self.admission_timeout)
+        else:
+            acquired = self._slots.acquire(blocking=False)
+        if not acquired:
+            raise PoolBusy(f"All {self.max_pending} parse slots are in use")
+        try:
+            future = self._executor.submit(ingest_log_file, db_path, log_path)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+_pool: Optional[ParsePool] = None
+_pool_lock = threading.Lock()
+
+
+def get_parse_pool(max_workers: Optional[int] = None, max_pending: Optional[int] = None,
+                   admission_timeout: float = 0.0) -> ParsePool:
+    """Return the process-wide ParsePool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ParsePool(max_workers, max_pending, admission_timeout)
+            atexit.register(_pool.shutdown)
+        return _pool
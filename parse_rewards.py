@@ -1,74 +1,330 @@
+import os
 import re
+import csv
+import glob
+import json
+import heapq
+import hashlib
+import argparse
+import logging
 from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 import pandas as pd
 
-def parse_reward_file(filepath):
-    # Extract client_id and worker_id from filename
+from log_reader import detect_compression, open_log
+
+DEFAULT_FILES = [
+    'search_results_client_2_UID_87_Rewarding miner=221.txt',
+    'search_results_client_2_UID_87_Rewarding_miner_122.txt',
+    'search_results_client_UID_199_Rewarding miner=203.txt',
+    'search_results_client_UID_199_Rewarding miner=221.txt',
+    'search_results_client_2_UID_87_Rewarding_miner_203.txt',
+    'search_results_client_2_UID_87_Rewarding_miner_221.txt'
+]
+FIELDS = ['client_id', 'worker_id', 'row_number', 'day', 'hour', 'minute', 'reward_size']
+# Parsed rows also carry their full date (YYYY-MM-DD) for partitioning; it isn't a table column
+DATE_FIELD = 'date'
+# How much of a source's start is hashed to tell when it was replaced
+HEAD_BYTES = 4096
+
+logger = logging.getLogger(__name__)
+
+def reward_file_ids(filepath: str) -> Tuple[Optional[str], Optional[str]]:
+    """Extract client_id and worker_id from a reward file's name."""
     filename = filepath.split('/')[-1]
     client_match = re.search(r'client_(?:2_)?UID_(\d+)', filename)
     worker_match = re.search(r'miner[_=](\d+)', filename)
-    
+
     client_id = client_match.group(1) if client_match else None
     worker_id = worker_match.group(1) if worker_match else None
-    
+    return client_id, worker_id
+
+def parse_reward_lines(lines: Iterable[str], client_id: Optional[str], worker_id: Optional[str]) -> List[Dict[str, Any]]:
     data = []
-    
-    with open(filepath, 'r', encoding='utf-8') as f:
-        for line in f:
-            # Split on ζ or tab
-            parts = re.split('[ζ\t]', line.strip())
-            if len(parts) >= 2:
-                row_num = parts[0]
-                # Extract timestamp and reward
-                timestamp_match = re.search(r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}):\d{2}', parts[1])
-                reward_match = re.search(r'reward=([0-9.-]+)', parts[1])
-                
-                if timestamp_match and reward_match:
-                    timestamp = datetime.strptime(timestamp_match.group(1), '%Y-%m-%d %H:%M')
-                    reward = float(reward_match.group(1))
-                    
-                    data.append({
-                        'client_id': client_id,
-                        'worker_id': worker_id,
-                        'row_number': row_num,
-                        'day': timestamp.day,
-                        'hour': timestamp.hour,
-                        'minute': timestamp.minute,
-                        'reward_size': reward
-                    })
-    
+    for line in lines:
+        # Split on ζ or tab
+        parts = re.split('[ζ\t]', line.strip())
+        if len(parts) >= 2:
+            row_num = parts[0]
+            # Extract timestamp and reward
+            timestamp_match = re.search(r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}):\d{2}', parts[1])
+            reward_match = re.search(r'reward=([0-9.-]+)', parts[1])
+
+            if timestamp_match and reward_match:
+                timestamp = datetime.strptime(timestamp_match.group(1), '%Y-%m-%d %H:%M')
+                reward = float(reward_match.group(1))
+
+                data.append({
+                    'client_id': client_id,
+                    'worker_id': worker_id,
+                    'row_number': row_num,
+                    'day': timestamp.day,
+                    'hour': timestamp.hour,
+                    'minute': timestamp.minute,
+                    'reward_size': reward,
+                    DATE_FIELD: timestamp.strftime('%Y-%m-%d')
+                })
     return data
 
-def main():
-    files = [
-        'search_results_client_2_UID_87_Rewarding miner=221.txt',
-        'search_results_client_2_UID_87_Rewarding_miner_122.txt',
-        'search_results_client_UID_199_Rewarding miner=203.txt',
-        'search_results_client_UID_199_Rewarding miner=221.txt',
-        'search_results_client_2_UID_87_Rewarding_miner_203.txt',
-        'search_results_client_2_UID_87_Rewarding_miner_221.txt'
-    ]
-    
-    all_data = []
+def parse_reward_file(filepath):
+    client_id, worker_id = reward_file_ids(filepath)
+    with open_log(filepath) as f:
+        return parse_reward_lines(f, client_id, worker_id)
+
+def head_digest(filepath: str, size: int) -> str:
+    with open(filepath, 'rb') as f:
+        return hashlib.sha1(f.read(size)).hexdigest()
+
+def source_changed(filepath: str, source_state: Dict[str, Any]) -> bool:
+    """Whether a reward file is no longer the one `source_state` was read from.
+
+    A different inode, a smaller size or a different head digest means it
+    was truncated or replaced, and its rows in the table can't be trusted.
+    So does a last line ingested without its newline that has since changed.
+    """
+    if not source_state:
+        return False
+    stat = os.stat(filepath)
+    if stat.st_ino != source_state.get('inode') or stat.st_size < source_state.get('size', 0):
+        return True
+    if 'head' in source_state and head_digest(filepath, source_state['head_size']) != source_state['head']:
+        return True
+    partial = source_state.get('partial_line')
+    if partial is None:
+        return False
+    with open(filepath, 'rb') as f:
+        f.seek(source_state['offset'])
+        line = f.readline().decode('utf-8', errors='replace')
+    if line.endswith('\n'):
+        return line.rstrip('\r\n') != partial.rstrip('\r')
+    return not line.startswith(partial)
+
+def read_new_lines(filepath: str, source_state: Dict[str, Any],
+                   include_partial: bool = False) -> Tuple[List[str], Dict[str, Any]]:
+    """Return lines added to a reward file since `source_state`, and the new state.
+
+    Plain files are read from the stored byte offset, stopping before a
+    last line without a newline (it may still be being written). With
+    `include_partial` (for a full rebuild) that line is returned too, but the
+    offset stays before it and the state remembers it, so the next run skips
+    it once its newline arrives. Compressed files can't be seeked into, so
+    the lines already ingested are skipped instead. Check `source_changed`
+    first: this assumes the file only grew.
+    """
+    stat = os.stat(filepath)
+    if source_state.get('size') == stat.st_size and source_state.get('mtime_ns') == stat.st_mtime_ns:
+        return [], source_state
+    head_size = min(stat.st_size, HEAD_BYTES)
+    state = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'inode': stat.st_ino,
+             'head_size': head_size, 'head': head_digest(filepath, head_size)}
+    offset = source_state.get('offset', 0)
+    line_count = source_state.get('lines', 0)
+
+    if detect_compression(filepath) != 'plain':
+        with open_log(filepath) as f:
+            lines = [line for n, line in enumerate(f) if n >= line_count]
+        return lines, {**state, 'lines': line_count + len(lines)}
+
+    with open(filepath, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b'\n') + 1
+    lines = data[:end].decode('utf-8', errors='replace').splitlines(keepends=True)
+    state.update(offset=offset + end, lines=line_count + len(lines))
+    ingested = source_state.get('partial_line')
+    if ingested is not None:
+        if lines:
+            # Already parsed before its newline; source_changed checks it's the same line
+            lines = lines[1:]
+        else:
+            state['partial_line'] = ingested
+    if include_partial and data[end:]:
+        state['partial_line'] = data[end:].decode('utf-8', errors='replace')
+        lines.append(state['partial_line'])
+    return lines, state
+
+def sort_key(row: Dict[str, Any]) -> Tuple[int, int, int]:
+    return int(row['day']), int(row['hour']), int(row['minute'])
+
+def merge_into_table(table_path: str, new_rows: List[Dict[str, Any]]) -> None:
+    """Merge rows into a CSV already sorted by (day, hour, minute), keeping it sorted.
+
+    Rows that sort after the table's last row are simply appended; otherwise
+    the table is streamed through a merge into a new file, never loaded whole.
+    """
+    new_rows = sorted(new_rows, key=sort_key)
+    if not os.path.exists(table_path):
+        with open(table_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS, extrasaction='ignore', lineterminator='\n')
+            writer.writeheader()
+            writer.writerows(new_rows)
+        return
+
+    last_row = _last_row(table_path)
+    if last_row is None or sort_key(new_rows[0]) >= sort_key(last_row):
+        with open(table_path, 'a', newline='', encoding='utf-8') as f:
+            csv.DictWriter(f, fieldnames=FIELDS, extrasaction='ignore', lineterminator='\n').writerows(new_rows)
+        return
+
+    tmp_path = table_path + '.tmp'
+    with open(table_path, 'r', newline='', encoding='utf-8') as src, \
+            open(tmp_path, 'w', newline='', encoding='utf-8') as dst:
+        writer = csv.DictWriter(dst, fieldnames=FIELDS, extrasaction='ignore', lineterminator='\n')
+        writer.writeheader()
+        # Existing rows come first among equal keys, like a stable sort
+        writer.writerows(heapq.merge(csv.DictReader(src), new_rows, key=sort_key))
+    os.replace(tmp_path, table_path)
+
+def _last_row(table_path: str) -> Optional[Dict[str, str]]:
+    with open(table_path, 'rb') as f:
+        header = f.readline()
+        end = f.seek(0, os.SEEK_END)
+        if end <= len(header):
+            return None
+        # The last line fits in the final few KB of the file
+        f.seek(max(end - 4096, len(header)))
+        lines = f.read().splitlines()
+    values = next(csv.reader([lines[-1].decode('utf-8')]))
+    return dict(zip(FIELDS, values))
+
+def iter_partition_rows(rows: List[Dict[str, Any]]) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    by_date: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        by_date.setdefault(row[DATE_FIELD], []).append(row)
+    yield from sorted(by_date.items())
+
+def load_state(state_path: str) -> Dict[str, Any]:
+    if not os.path.exists(state_path):
+        return {'sources': {}}
+    with open(state_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_state(state: Dict[str, Any], state_path: str) -> None:
+    tmp_path = state_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, state_path)
+
+def default_state_path(table_path: str, partition_dir: Optional[str] = None) -> str:
+    if partition_dir:
+        return os.path.join(partition_dir, 'state.json')
+    return table_path + '.state.json'
+
+def collect_new_rows(files: List[str], state: Dict[str, Any], include_partial: bool = False) -> List[Dict[str, Any]]:
+    """Parse rows added since `state` and record the new offsets in it."""
+    new_rows = []
     for file in files:
+        path = os.path.abspath(file)
         try:
-            print(f"Processing file: {file}")
-            all_data.extend(parse_reward_file(file))
+            lines, state['sources'][path] = read_new_lines(path, state['sources'].get(path, {}), include_partial)
         except FileNotFoundError:
-            print(f"Warning: File not found: {file}")
+            logger.warning(f"File not found: {file}")
             continue
-    
+        if lines:
+            client_id, worker_id = reward_file_ids(path)
+            rows = parse_reward_lines(lines, client_id, worker_id)
+            logger.info(f"{file}: {len(rows)} new rows")
+            new_rows.extend(rows)
+    return new_rows
+
+def store_rows(rows: List[Dict[str, Any]], table_path: str, partition_dir: Optional[str] = None) -> None:
+    if partition_dir:
+        for date, date_rows in iter_partition_rows(rows):
+            merge_into_table(os.path.join(partition_dir, f'rewards_date={date}.csv'), date_rows)
+    else:
+        merge_into_table(table_path, rows)
+
+def changed_sources(state: Dict[str, Any]) -> List[str]:
+    changed = []
+    for path, source_state in state['sources'].items():
+        try:
+            if source_changed(path, source_state):
+                changed.append(path)
+        except FileNotFoundError:
+            continue
+    return changed
+
+def rebuild_rewards(files: List[str], table_path: str,
+                    partition_dir: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Rewrite the table or partitions from the start of `files`; returns the rows and the new state."""
+    if partition_dir:
+        for path in glob.glob(os.path.join(partition_dir, 'rewards_date=*.csv')):
+            os.remove(path)
+    elif os.path.exists(table_path):
+        os.remove(table_path)
+    state = {'sources': {}}
+    rows = collect_new_rows(files, state)
+    if rows:
+        store_rows(rows, table_path, partition_dir)
+    return rows, state
+
+def update_rewards(files: List[str], table_path: str, partition_dir: Optional[str] = None,
+                   state_path: Optional[str] = None) -> int:
+    """Ingest only the reward rows added since the last run; returns how many.
+
+    Rows go into one sorted CSV (`table_path`) or into one sorted CSV per date
+    under `partition_dir`, where only the dates that got new rows are touched.
+    If a source was truncated or replaced, everything is rebuilt instead of
+    appending its rows again.
+    """
+    if partition_dir:
+        os.makedirs(partition_dir, exist_ok=True)
+    state_path = state_path or default_state_path(table_path, partition_dir)
+    state = load_state(state_path)
+    if not state['sources'] and not partition_dir and os.path.exists(table_path):
+        raise ValueError(f"{table_path} exists but {state_path} doesn't; rebuild it without --incremental first")
+
+    changed = changed_sources(state)
+    if changed:
+        logger.warning(f"{', '.join(changed)} changed since it was read, rebuilding {partition_dir or table_path}")
+        # Sources only known from the state are read too, so their rows aren't lost
+        all_files = list(dict.fromkeys([os.path.abspath(file) for file in files] + list(state['sources'])))
+        new_rows, state = rebuild_rewards(all_files, table_path, partition_dir)
+    else:
+        new_rows = collect_new_rows(files, state)
+        if new_rows:
+            store_rows(new_rows, table_path, partition_dir)
+    # Only saved once the rows are in the table, so a failed run is retried
+    save_state(state, state_path)
+    return len(new_rows)
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    arg_parser = argparse.ArgumentParser(description='Build the rewards table from client reward logs.')
+    arg_parser.add_argument('files', nargs='*', default=DEFAULT_FILES, help='Reward files (plain, gzip or zstd)')
+    arg_parser.add_argument('-o', '--output', default='rewards_table.csv')
+    arg_parser.add_argument('--incremental', action='store_true',
+                            help='Only add rows written since the last run, keeping the table sorted')
+    arg_parser.add_argument('--partition-dir',
+                            help='Incrementally maintain one CSV per date in this directory instead')
+    arg_parser.add_argument('--state', help='Where ingested offsets are kept (default: next to the output)')
+    args = arg_parser.parse_args()
+
+    if args.incremental or args.partition_dir:
+        try:
+            added = update_rewards(args.files, args.output, args.partition_dir, args.state)
+        except ValueError as e:
+            raise SystemExit(str(e))
+        print(f"Added {added} rows to {args.partition_dir or args.output}")
+        return
+
+    # Full rebuild; the offsets are still recorded so --incremental can carry on from here.
+    # Every line is parsed, like parse_reward_file, including a last line without a newline
+    state = {'sources': {}}
+    all_data = collect_new_rows(args.files, state, include_partial=True)
+
     if not all_data:
         print("No data was collected!")
         return
         
     # Convert to DataFrame and sort
     df = pd.DataFrame(all_data)
-    df = df.sort_values(['day', 'hour', 'minute'])
+    df = df.sort_values(['day', 'hour', 'minute'], kind='stable')
     
-    # Save to CSV
-    df.to_csv('rewards_table.csv', index=False)
-    print("Table saved to rewards_table.csv")
+    # Save to CSV, with the same line endings as rows appended later
+    df[FIELDS].to_csv(args.output, index=False, lineterminator='\n')
+    save_state(state, args.state or default_state_path(args.output))
+    print(f"Table saved to {args.output}")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,130 @@
+import sys
+import json
+import argparse
+import logging
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List
+
+from enhanced_worker_log_parser import WorkerJob
+from job_metrics import QuantileSketch, WINDOWS, window_start
+from log_merge import iter_merged_jobs
+
+
+class ProxyStats:
+    """Download counts and latency distribution for one proxy."""
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.attempts = 0
+        self.downloads = 0
+        self.busy_time = 0.0
+        self.latency = QuantileSketch(relative_accuracy)
+
+    @property
+    def failures(self) -> int:
+        # A proxy assignment without a matching download counts as failed
+        return max(self.attempts - self.downloads, 0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'attempts': self.attempts,
+            'downloads': self.downloads,
+            'failures': self.failures,
+            'failure_rate': self.failures / self.attempts if self.attempts else None,
+            'throughput': self.downloads / self.busy_time if self.busy_time else None,
+            'latency': self.latency.to_dict()
+        }
+
+
+class ProxyPerformance:
+    """Aggregate per-proxy latency, failures and throughput across jobs.
+
+    Proxies are keyed by host:port (credentials are stripped by the parser).
+    Besides overall stats, per-window download counts and latency sketches
+    show how each proxy behaves over time.
+    """
+
+    def __init__(self, window: str = 'hour', relative_accuracy: float = 0.01):
+        if window not in WINDOWS:
+            raise ValueError(f"Unknown window '{window}', expected one of {sorted(WINDOWS)}")
+        self.window = window
+        self.window_seconds = WINDOWS[window]
+        self.relative_accuracy = relative_accuracy
+        self.proxies: Dict[str, ProxyStats] = {}
+        self.windows: Dict[str, Dict[str, ProxyStats]] = defaultdict(dict)
+
+    def _stats(self, table: Dict[str, ProxyStats], proxy: str) -> ProxyStats:
+        stats = table.get(proxy)
+        if stats is None:
+            stats = table[proxy] = ProxyStats(self.relative_accuracy)
+        return stats
+
+    def add_job(self, job: WorkerJob) -> None:
+        download = (job.stages or {}).get('download')
+        if not download:
+            return
+        key = window_start(job.start_time, self.window_seconds)
+        for proxy, attempts in (download.get('proxy_attempts') or {}).items():
+            self._stats(self.proxies, proxy).attempts += attempts
+            self._stats(self.windows[key], proxy).attempts += attempts
+        for item in download.get('proxy_downloads') or []:
+            for stats in (self._stats(self.proxies, item['proxy']), self._stats(self.windows[key], item['proxy'])):
+                stats.downloads += 1
+                stats.busy_time += item['time']
+                stats.latency.add(item['time'])
+
+    def consume(self, jobs: Iterable[WorkerJob]) -> 'ProxyPerformance':
+        for job in jobs:
+            self.add_job(job)
+        return self
+
+    def slow_proxies(self, quantile: float = 0.9, factor: float = 2.0, min_downloads: int = 5) -> List[str]:
+        """Proxies whose latency quantile is `factor` times the median proxy's."""
+        values = {
+            proxy: stats.latency.quantile(quantile)
+            for proxy, stats in self.proxies.items() if stats.downloads >= min_downloads
+        }
+        if not values:
+            return []
+        ordered = sorted(values.values())
+        typical = ordered[len(ordered) // 2]
+        return sorted((p for p, v in values.items() if v > factor * typical), key=values.get, reverse=True)
+
+    def summary(self, per_window: bool = True) -> Dict[str, Any]:
+        proxies = sorted(
+            self.proxies.items(), key=lambda item: item[1].latency.quantile(0.9) or 0.0, reverse=True
+        )
+        summary = {
+            'window': self.window,
+            'proxies': {proxy: stats.to_dict() for proxy, stats in proxies},
+            'slow_proxies': self.slow_proxies()
+        }
+        if per_window:
+            summary['windows'] = [{
+                'window_start': key,
+                'proxies': {
+                    proxy: {
+                        'downloads': stats.downloads,
+                        'failures': stats.failures,
+                        'downloads_per_minute': stats.downloads * 60 / self.window_seconds,
+                        'p50': stats.latency.quantile(0.5),
+                        'p90': stats.latency.quantile(0.9)
+                    } for proxy, stats in sorted(self.windows[key].items())
+                }
+            } for key in sorted(self.windows)]
+        return summary
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    arg_parser = argparse.ArgumentParser(description='Report per-proxy download latency and failures.')
+    arg_parser.add_argument('log_paths', nargs='+', help='Worker logs (plain, gzip or zstd)')
+    arg_parser.add_argument('--window', choices=sorted(WINDOWS), default='hour')
+    arg_parser.add_argument('--no-windows', action='store_true', help='Only print overall per-proxy stats')
+    args = arg_parser.parse_args()
+
+    performance = ProxyPerformance(window=args.window).consume(iter_merged_jobs(args.log_paths))
+    json.dump(performance.summary(per_window=not args.no_windows), sys.stdout, indent=2)
+    print()
+
+if __name__ == "__main__":
+    main()
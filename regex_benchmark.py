@@ -0,0 +1,91 @@
+import sys
+import time
+import argparse
+import logging
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from enhanced_worker_log_parser import EnhancedWorkerLogParser
+from synthetic_logs import format_line, generate_log_lines
+
+# Slowest acceptable time for handling one line, in seconds
+DEFAULT_BUDGET = 0.1
+
+
+def pathological_lines(length: int) -> Dict[str, str]:
+    """Long lines built to trigger backtracking in the parser's regexes."""
+    def fill(unit: str, prefix: str = '', suffix: str = '') -> str:
+        message = prefix + unit * max(1, (length - len(prefix) - len(suffix)) // len(unit)) + suffix
+        return format_line(datetime(2024, 6, 18, 14, 30, 9), message)
+
+    return {
+        'repeated video_id': fill("video_id='x' "),
+        'repeated video details': fill("video_id='a' title='x' description="),
+        'numbered list without brackets': fill('1. a: b [ ] '),
+        'repeated Query': fill('Query a '),
+        'long digit run': fill('1', 'Received scraping request: '),
+        # Ends in "Proxy used:" so the download extractor runs on it
+        'repeated Downloaded video': fill('Downloaded video a ', suffix='Proxy used: x y'),
+        'unterminated request line': fill('a - timeout ', 'Incoming request: UID 1 - HK '),
+        'error with huge payload': fill('x: ', 'Error: '),
+        'huge load balancer response': fill(
+            "VideoMetadata(video_id='abcdefghijk', description='Desc. with: [brackets]', views=1, "
+            "start_time=0, end_time=5, video_emb=[0.1, 0.2, 0.3]), ",
+            'Received response: ['
+        ),
+    }
+
+
+def time_line(parser: EnhancedWorkerLogParser, line: str) -> Tuple[float, float]:
+    """Seconds spent recognizing the line and parsing a job that contains it."""
+    job_lines = list(generate_log_lines(1, blacklist_rate=0.0, fail_rate=0.0))
+    # Put the line right after the load balancer line, where a response is expected
+    position = next(i for i, l in enumerate(job_lines) if 'Data received from load balancer' in l) + 1
+    job_lines[position] = line
+
+    started = time.perf_counter()
+    parser._is_recognized(line)
+    recognize = time.perf_counter() - started
+
+    started = time.perf_counter()
+    parser._process_job(job_lines)
+    process = time.perf_counter() - started
+    return recognize, process
+
+
+def run_benchmark(length: int, budget: float) -> List[str]:
+    """Print timings for every pathological case; return the ones over budget."""
+    parser = EnhancedWorkerLogParser()
+    slow = []
+    print(f"{'case':<32}{'length':>10}{'recognize s':>14}{'process s':>12}")
+    for name, line in pathological_lines(length).items():
+        recognize, process = time_line(parser, line)
+        print(f"{name:<32}{len(line):>10}{recognize:>14.4f}{process:>12.4f}")
+        if max(recognize, process) > budget:
+            slow.append(name)
+
+    jobs = 500
+    lines = list(generate_log_lines(jobs, seed=1))
+    started = time.perf_counter()
+    for _ in EnhancedWorkerLogParser().iter_jobs_from_lines(lines):
+        pass
+    elapsed = time.perf_counter() - started
+    print(f"\nRegular log: {jobs} jobs, {len(lines)} lines in {elapsed:.3f}s ({len(lines) / elapsed:,.0f} lines/s)")
+    return slow
+
+
+def main():
+    logging.basicConfig(level=logging.ERROR)
+    arg_parser = argparse.ArgumentParser(description='Time the parser on lines built to cause regex backtracking.')
+    arg_parser.add_argument('--length', type=int, default=200_000, help='Approximate length of each test line')
+    arg_parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET,
+                            help='Seconds one line may take before the run fails')
+    args = arg_parser.parse_args()
+
+    slow = run_benchmark(args.length, args.budget)
+    if slow:
+        print(f"\nOver the {args.budget}s budget: {', '.join(slow)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+import os
+import sys
+import csv
+import glob
+import json
+import math
+import argparse
+import logging
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from enhanced_worker_log_parser import TIMESTAMP_FORMAT, WorkerJob
+from log_merge import iter_merged_jobs
+from stage_latency import job_latency_breakdown
+
+# Job features correlated with reward
+FEATURES = ['total_time', 'augmentation', 'search', 'download', 'embedding', 'load_balancer', 'delivered']
+# Reward timestamps are truncated to the minute
+REWARD_RESOLUTION = 60.0
+# Rewards are attached to a job that started at most this many seconds earlier
+DEFAULT_WINDOW = 600.0
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class JobPoint:
+    """The parts of a job needed for joining, kept small for large log sets."""
+    start: float
+    job_id: str
+    start_time: str
+    status: str
+    features: Tuple[Optional[float], ...]
+
+
+@dataclass
+class RewardPoint:
+    time: float
+    row_number: str
+    reward: float
+
+
+def job_point(job: WorkerJob) -> Optional[Tuple[int, JobPoint]]:
+    """Return (client uid, JobPoint), or None for jobs without a request line."""
+    uid = ((job.stages or {}).get('request') or {}).get('uid')
+    if uid is None or not job.start_time:
+        return None
+    breakdown = job_latency_breakdown(job) or {'stages': {}, 'total_time': None}
+    stages = breakdown['stages']
+    features = (
+        breakdown['total_time'], stages.get('augmentation'), stages.get('search'), stages.get('download'),
+        stages.get('embedding'), stages.get('load_balancer'), (job.results or {}).get('delivered_count')
+    )
+    start = datetime.strptime(job.start_time, TIMESTAMP_FORMAT).timestamp()
+    return uid, JobPoint(start, job.job_id, job.start_time, job.status, features)
+
+
+def resolve_reward_time(day: int, hour: int, minute: int, reference: datetime) -> datetime:
+    """Place a (day, hour, minute) reward in the month closest to `reference`.
+
+    The rewards table has no year or month, so they are taken from the jobs.
+    """
+    candidates = []
+    for month_offset in (-1, 0, 1):
+        month_index = reference.year * 12 + reference.month - 1 + month_offset
+        try:
+            candidates.append(datetime(month_index // 12, month_index % 12 + 1, day, hour, minute))
+        except ValueError:
+            # e.g. day 31 in a 30-day month
+            continue
+    return min(candidates, key=lambda candidate: abs(candidate - reference))
+
+
+def reward_files(paths: List[str]) -> List[str]:
+    """Expand a partitioned rewards directory into its per-date files."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, 'rewards_date=*.csv'))))
+        else:
+            files.append(path)
+    return files
+
+
+def load_rewards(paths: List[str]) -> Dict[Tuple[int, int], List[Tuple[int, int, int, str, float]]]:
+    """Group reward rows by (client_id, worker_id)."""
+    groups = defaultdict(list)
+    for path in reward_files(paths):
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                if not row['client_id'] or not row['worker_id']:
+                    continue
+                groups[int(float(row['client_id'])), int(float(row['worker_id']))].append((
+                    int(row['day']), int(row['hour']), int(row['minute']), row['row_number'], float(row['reward_size'])
+                ))
+    return groups
+
+
+def load_jobs(worker_logs: Dict[int, List[str]]) -> Dict[Tuple[int, int], List[JobPoint]]:
+    """Parse each worker's logs and group its jobs by (client uid, worker id)."""
+    groups = defaultdict(list)
+    for worker_id, log_paths in worker_logs.items():
+        for job in iter_merged_jobs(log_paths):
+            point = job_point(job)
+            if point is not None:
+                uid, job_data = point
+                groups[uid, worker_id].append(job_data)
+    return groups
+
+
+def join_group(jobs: List[JobPoint], rewards: List[RewardPoint], window: float = DEFAULT_WINDOW,
+               resolution: float = REWARD_RESOLUTION) -> Iterator[Tuple[Optional[JobPoint], Optional[RewardPoint]]]:
+    """Pair each reward with the oldest unmatched job that started before it.
+
+    Both lists must be sorted by time. Rewards are paid in the order jobs
+    were served, so matching is first in, first out. A job can receive a
+    reward up to `window` seconds after it started, and only if it started
+    no later than the end of the reward's minute. Jobs and rewards left
+    without a partner are yielded with None on the other side. Runs in
+    O(len(jobs) + len(rewards)).
+    """
+    candidates = deque()
+    next_job = 0
+    for reward in rewards:
+        while next_job < len(jobs) and jobs[next_job].start <= reward.time + resolution:
+            candidates.append(jobs[next_job])
+            next_job += 1
+        while candidates and candidates[0].start < reward.time - window:
+            yield candidates.popleft(), None
+        yield (candidates.popleft() if candidates else None), reward
+    yield from ((job, None) for job in candidates)
+    yield from ((job, None) for job in jobs[next_job:])
+
+
+class RunningCorrelation:
+    """Streaming Pearson correlation and least-squares slope of y on x (Welford updates)."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.m2_x = 0.0
+        self.m2_y = 0.0
+        self.co_moment = 0.0
+
+    def add(self, x: float, y: float) -> None:
+        self.n += 1
+        dx = x - self.mean_x
+        dy = y - self.mean_y
+        self.mean_x += dx / self.n
+        self.mean_y += dy / self.n
+        self.m2_x += dx * (x - self.mean_x)
+        self.m2_y += dy * (y - self.mean_y)
+        self.co_moment += dx * (y - self.mean_y)
+
+    def to_dict(self) -> Dict[str, Any]:
+        r = None
+        if self.n > 1 and self.m2_x > 0 and self.m2_y > 0:
+            r = self.co_moment / math.sqrt(self.m2_x * self.m2_y)
+        return {
+            'n': self.n,
+            'pearson_r': r,
+            'slope': self.co_moment / self.m2_x if self.m2_x > 0 else None,
+            'mean_x': self.mean_x if self.n else None,
+            'mean_y': self.mean_y if self.n else None
+        }
+
+
+class RewardJoin:
+    """Join rewards to jobs per (client, worker) and correlate job features with reward."""
+
+    def __init__(self, window: float = DEFAULT_WINDOW):
+        self.window = window
+        self.counts = defaultdict(int)
+        self.correlations = {feature: RunningCorrelation() for feature in FEATURES}
+        # status -> [matched jobs, reward sum]
+        self.reward_by_status = defaultdict(lambda: [0, 0.0])
+
+    def run(self, job_groups: Dict[Tuple[int, int], List[JobPoint]],
+            reward_groups: Dict[Tuple[int, int], List[Tuple[int, int, int, str, float]]],
+            include_unmatched: bool = False) -> Iterator[Dict[str, Any]]:
+        """Yield one row per matched pair (and per leftover job or reward if asked)."""
+        for key in sorted(set(job_groups) | set(reward_groups)):
+            client_id, worker_id = key
+            jobs = sorted(job_groups.get(key, []), key=lambda job: job.start)
+            rewards = self._reward_points(reward_groups.get(key, []), jobs)
+            for job, reward in join_group(jobs, rewards, self.window):
+                row = self._record(client_id, worker_id, job, reward)
+                if include_unmatched or (job is not None and reward is not None):
+                    yield row
+
+    def _reward_points(self, rows: List[Tuple[int, int, int, str, float]], jobs: List[JobPoint]) -> List[RewardPoint]:
+        if not rows:
+            return []
+        reference = datetime.fromtimestamp(jobs[0].start) if jobs else datetime.now()
+        points = []
+        for day, hour, minute, row_number, reward in sorted(rows, key=lambda row: row[:3]):
+            resolved = resolve_reward_time(day, hour, minute, reference)
+            # Track the rewards themselves so long spans roll over into later months
+            reference = resolved
+            points.append(RewardPoint(resolved.timestamp(), row_number, reward))
+        points.sort(key=lambda point: point.time)
+        return points
+
+    def _record(self, client_id: int, worker_id: int, job: Optional[JobPoint],
+                reward: Optional[RewardPoint]) -> Dict[str, Any]:
+        if job is not None and reward is not None:
+            self.counts['matched'] += 1
+            for feature, value in zip(FEATURES, job.features):
+                if value is not None:
+                    self.correlations[feature].add(value, reward.reward)
+            self.reward_by_status[job.status][0] += 1
+            self.reward_by_status[job.status][1] += reward.reward
+        elif job is not None:
+            self.counts['unmatched_jobs'] += 1
+        else:
+            self.counts['unmatched_rewards'] += 1
+
+        row = {'client_id': client_id, 'worker_id': worker_id}
+        if job is not None:
+            row.update({'job_id': job.job_id, 'job_start': job.start_time, 'status': job.status})
+            row.update(zip(FEATURES, job.features))
+        if reward is not None:
+            row.update({
+                'reward_time': datetime.fromtimestamp(reward.time).strftime('%Y-%m-%d %H:%M'),
+                'row_number': reward.row_number,
+                'reward': reward.reward
+            })
+            if job is not None:
+                row['reward_lag'] = reward.time - job.start
+        return row
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'window': self.window,
+            **{name: self.counts[name] for name in ('matched', 'unmatched_jobs', 'unmatched_rewards')},
+            'reward_vs': {feature: corr.to_dict() for feature, corr in self.correlations.items()},
+            'mean_reward_by_status': {
+                status: {'n': n, 'mean': total / n} for status, (n, total) in sorted(self.reward_by_status.items())
+            }
+        }
+
+
+def parse_worker_arg(value: str) -> Tuple[int, str]:
+    worker_id, _, path = value.partition('=')
+    if not path or not worker_id.isdigit():
+        raise argparse.ArgumentTypeError(f"Expected WORKER_ID=LOG_PATH, got '{value}'")
+    return int(worker_id), path
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    arg_parser = argparse.ArgumentParser(description='Join rewards to worker jobs and correlate reward with latency.')
+    arg_parser.add_argument('--rewards', nargs='+', default=['rewards_table.csv'],
+                            help='Rewards CSVs from parse_rewards.py, or a --partition-dir directory')
+    arg_parser.add_argument('--worker', type=parse_worker_arg, action='append', required=True,
+                            metavar='WORKER_ID=LOG_PATH', help='A worker (miner) log; repeat for more logs or workers')
+    arg_parser.add_argument('--window', type=float, default=DEFAULT_WINDOW,
+                            help='Max seconds between a job starting and its reward')
+    arg_parser.add_argument('-o', '--output', help='Write joined rows as JSON lines here')
+    arg_parser.add_argument('--include-unmatched', action='store_true',
+                            help='Also write jobs and rewards that found no partner')
+    args = arg_parser.parse_args()
+
+    worker_logs = defaultdict(list)
+    for worker_id, path in args.worker:
+        worker_logs[worker_id].append(path)
+
+    join = RewardJoin(window=args.window)
+    rows = join.run(load_jobs(worker_logs), load_rewards(args.rewards), args.include_unmatched)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps(row) + '\n')
+    else:
+        for _ in rows:
+            pass
+    json.dump(join.summary(), sys.stdout, indent=2)
+    print()
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,21 @@ import sys
 from pathlib import Path
 import re
 
+from log_reader import iter_log_lines
+
 def create_safe_filename(search_string: str) -> str:
     """Create a safe filename by removing/replacing unsafe characters."""
     # Replace unsafe characters with underscores
     safe_string = re.sub(r'[=\s/\\<>:"|?*]', '_', search_string)
     return safe_string
 
+def log_stem(file_path: str) -> str:
+    """Return the file stem, ignoring a trailing compression suffix."""
+    path = Path(file_path)
+    if path.suffix in ('.gz', '.zst'):
+        path = path.with_suffix('')
+    return path.stem
+
 def search_in_file(file_path: str, search_string: str):
     """
     Search for string in file and write matches to output file.
@@ -18,7 +27,7 @@ def search_in_file(file_path: str, search_string: str):
     """
     # Create safe output file name
     safe_search = create_safe_filename(search_string)
-    output_file = f"search_results_{Path(file_path).stem}_{safe_search}.txt"
+    output_file = f"search_results_{log_stem(file_path)}_{safe_search}.txt"
     print(f"Will write results to: {output_file}")
     
     try:
@@ -27,15 +36,14 @@ def search_in_file(file_path: str, search_string: str):
         
         # Open output file once, outside the encoding loop
         with open(output_file, 'w', encoding='utf-8') as out:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                for line_num, line in enumerate(f, 1):
-                    # Remove ANSI color codes
-                    clean_line = re.sub(r'\x1b\[\d+m', '', line)
-                    if search_string in clean_line:
-                        out.write(f"{line_num}ζ{clean_line}")
-                        matches += 1
-                        if matches <= 3:  # Print first 3 matches for debugging
-                            print(f"Found match at line {line_num}: {clean_line.strip()}")
+            for line_num, line in enumerate(iter_log_lines(file_path), 1):
+                # Remove ANSI color codes
+                clean_line = re.sub(r'\x1b\[\d+m', '', line)
+                if search_string in clean_line:
+                    out.write(f"{line_num}ζ{clean_line}")
+                    matches += 1
+                    if matches <= 3:  # Print first 3 matches for debugging
+                        print(f"Found match at line {line_num}: {clean_line.strip()}")
             
             print(f"Found {matches} matches")
             if matches > 0:
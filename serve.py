@@ -0,0 +1,36 @@
+import os
+import argparse
+import logging
+
+from app import app
+
+
+def main():
+    """Serve the app with a production WSGI server instead of Flask's dev server."""
+    logging.basicConfig(level=logging.INFO)
+    arg_parser = argparse.ArgumentParser(description='Run the log parser web app in production mode.')
+    arg_parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    arg_parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    arg_parser.add_argument('--threads', type=int, default=int(os.environ.get('SERVER_THREADS', 16)),
+                            help='Request threads; parsing itself runs in the shared process pool')
+    args = arg_parser.parse_args()
+
+    try:
+        from waitress import serve
+    except ImportError:
+        raise SystemExit("Production mode requires the 'waitress' package (pip install waitress)")
+
+    if app.config['LIVE_MAX_CLIENTS'] >= args.threads:
+        arg_parser.error(
+            f"--threads ({args.threads}) must exceed LIVE_MAX_CLIENTS ({app.config['LIVE_MAX_CLIENTS']}), "
+            "or live feed viewers can take every request thread"
+        )
+
+    logging.getLogger(__name__).info(
+        f"Serving on {args.host}:{args.port} with {args.threads} threads, "
+        f"{app.config['PARSE_WORKERS']} parse workers, {app.config['PARSE_QUEUE']} parse slots"
+    )
+    serve(app, host=args.host, port=args.port, threads=args.threads)
+
+if __name__ == "__main__":
+    main()
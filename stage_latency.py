@@ -0,0 +1,165 @@
+import argparse
+import logging
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+from enhanced_worker_log_parser import WorkerJob
+from job_metrics import QuantileSketch
+from log_merge import iter_merged_jobs
+
+# Stage name -> path of the timing field inside job.stages
+STAGE_FIELDS = [
+    ('augmentation', ('query_processing', 'augmentation_time')),
+    ('search', ('search', 'search_time')),
+    ('download', ('download', 'download_time')),
+    ('embedding', ('processing', 'embedding_time')),
+    ('load_balancer', ('processing', 'load_balancer', 'response_time')),
+]
+STAGES = [name for name, _ in STAGE_FIELDS] + ['other']
+# Jobs finishing with less than this share of the timeout left are "at risk"
+AT_RISK_HEADROOM = 0.1
+
+
+def _field(data: Optional[Dict[str, Any]], path) -> Optional[float]:
+    for key in path:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def job_latency_breakdown(job: WorkerJob) -> Optional[Dict[str, Any]]:
+    """Split a job's time into stages and compare it with the validator timeout.
+
+    Returns None for jobs that never got past the request stage (e.g.
+    blacklisted ones). Time not covered by a known stage is reported as
+    'other'.
+    """
+    stages_info = job.stages or {}
+    if job.status == 'blacklisted' or 'processing' not in stages_info:
+        return None
+
+    stages = {}
+    for name, path in STAGE_FIELDS:
+        value = _field(stages_info, path)
+        if value is not None:
+            stages[name] = value
+
+    total_time = (job.results or {}).get('total_time')
+    timeout = (stages_info.get('request') or {}).get('timeout')
+    accounted = sum(stages.values())
+    if total_time is not None:
+        stages['other'] = max(total_time - accounted, 0.0)
+
+    breakdown = {
+        'job_id': job.job_id,
+        'start_time': job.start_time,
+        'timeout': timeout,
+        'total_time': total_time,
+        'stages': stages,
+        'critical_stage': max(stages, key=stages.get) if stages else None,
+        'headroom': None,
+        'headroom_ratio': None,
+        'timed_out': None
+    }
+    if timeout and total_time is not None:
+        breakdown['headroom'] = timeout - total_time
+        breakdown['headroom_ratio'] = (timeout - total_time) / timeout
+        breakdown['timed_out'] = total_time > timeout
+    return breakdown
+
+
+class LatencyReport:
+    """Tail distributions per stage and timeout headroom across many jobs."""
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.jobs = 0
+        self.skipped = 0
+        self.timed_out = 0
+        self.at_risk = 0
+        self.stages = {name: QuantileSketch(relative_accuracy) for name in STAGES}
+        self.total_time = QuantileSketch(relative_accuracy)
+        self.headroom = QuantileSketch(relative_accuracy)
+        self.stage_time = Counter()
+        self.critical_stages = Counter()
+
+    def add(self, breakdown: Optional[Dict[str, Any]]) -> None:
+        if breakdown is None:
+            self.skipped += 1
+            return
+        self.jobs += 1
+        for name, value in breakdown['stages'].items():
+            self.stages[name].add(value)
+            self.stage_time[name] += value
+        if breakdown['critical_stage']:
+            self.critical_stages[breakdown['critical_stage']] += 1
+        if breakdown['total_time'] is not None:
+            self.total_time.add(breakdown['total_time'])
+        if breakdown['headroom'] is not None:
+            # Sketches only hold non-negative values; overruns are counted separately
+            self.headroom.add(max(breakdown['headroom'], 0.0))
+            self.timed_out += breakdown['timed_out']
+            self.at_risk += breakdown['headroom_ratio'] < AT_RISK_HEADROOM
+
+    def add_job(self, job: WorkerJob) -> Optional[Dict[str, Any]]:
+        breakdown = job_latency_breakdown(job)
+        self.add(breakdown)
+        return breakdown
+
+    def consume(self, jobs: Iterable[WorkerJob]) -> 'LatencyReport':
+        for job in jobs:
+            self.add_job(job)
+        return self
+
+    def summary(self) -> Dict[str, Any]:
+        all_stage_time = sum(self.stage_time.values())
+        return {
+            'jobs': self.jobs,
+            'skipped': self.skipped,
+            'timed_out': self.timed_out,
+            'at_risk': self.at_risk,
+            'total_time': self.total_time.to_dict(),
+            'headroom': self.headroom.to_dict(quantiles=(0.01, 0.1, 0.5)),
+            'stages': {
+                name: {
+                    **sketch.to_dict(),
+                    'share': self.stage_time[name] / all_stage_time if all_stage_time else None,
+                    'critical_count': self.critical_stages[name]
+                } for name, sketch in self.stages.items()
+            }
+        }
+
+
+def format_report(summary: Dict[str, Any]) -> List[str]:
+    """Render a report summary as a plain-text table."""
+    def fmt(value):
+        return '-' if value is None else f'{value:.2f}'
+
+    lines = [
+        f"Jobs: {summary['jobs']} (skipped {summary['skipped']}), "
+        f"timed out: {summary['timed_out']}, under {AT_RISK_HEADROOM:.0%} headroom: {summary['at_risk']}",
+        f"Total time  p50 {fmt(summary['total_time']['p50'])}s  p99 {fmt(summary['total_time']['p99'])}s  "
+        f"headroom p1 {fmt(summary['headroom']['p1'])}s  p50 {fmt(summary['headroom']['p50'])}s",
+        '',
+        f"{'stage':<14}{'count':>8}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}{'share':>8}{'critical':>10}"
+    ]
+    for name, stats in summary['stages'].items():
+        share = '-' if stats['share'] is None else f"{stats['share']:.0%}"
+        lines.append(
+            f"{name:<14}{stats['count']:>8}{fmt(stats['p50']):>9}{fmt(stats['p90']):>9}"
+            f"{fmt(stats['p99']):>9}{fmt(stats['max']):>9}{share:>8}{stats['critical_count']:>10}"
+        )
+    return lines
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    arg_parser = argparse.ArgumentParser(description='Break job latency down by stage against the timeout.')
+    arg_parser.add_argument('log_paths', nargs='+', help='Worker logs (plain, gzip or zstd)')
+    args = arg_parser.parse_args()
+
+    report = LatencyReport().consume(iter_merged_jobs(args.log_paths))
+    print('\n'.join(format_report(report.summary())))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import random
+import string
+import argparse
+import logging
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional
+
+from enhanced_worker_log_parser import TIMESTAMP_FORMAT
+
+QUERIES = [
+    'Cable Management Best Practices', 'cats playing piano', 'street food in Bangkok',
+    'how to fix a bike chain', 'northern lights timelapse', 'beginner woodworking projects'
+]
+TOPICS = ['cats', 'cooking', 'travel', 'music', 'sports', 'science']
+PROXIES = [f'user:secret@10.0.{i // 256}.{i % 256}:50100' for i in range(1, 9)]
+
+
+def format_line(ts: datetime, message: str, level: str = 'INFO') -> str:
+    """Format a message the way the worker writes log lines."""
+    stamp = ts.strftime(TIMESTAMP_FORMAT)[:-3]
+    return f"\x1b[34m{stamp}\x1b[39m | \x1b[36m\x1b[1m{level:^16}\x1b[0m | {message}\n"
+
+
+def _video_id(rng: random.Random) -> str:
+    return ''.join(rng.choice(string.ascii_letters + string.digits + '-_') for _ in range(11))
+
+
+def generate_job_lines(rng: random.Random, ts: datetime, uid: int, hotkey: str,
+                       blacklist_rate: float = 0.1, fail_rate: float = 0.1,
+                       videos: int = 8, repeat_pool: Optional[List[str]] = None) -> List[str]:
+    """Lines for one request, in the same shape the worker writes them."""
+    timeout = rng.choice([12.0, 60.0, 120.0])
+    lines = [format_line(ts, f"Incoming request: UID {uid} - HK {hotkey} - timeout {timeout} s - stake {rng.randint(1, 10**6)}")]
+    if rng.random() < blacklist_rate:
+        lines.append(format_line(ts, f"Blacklisting hotkey {hotkey} Blacklisted: True, Insufficient stake"))
+        return lines
+
+    def step(seconds: float) -> datetime:
+        nonlocal ts
+        ts += timedelta(seconds=seconds)
+        return ts
+
+    query = rng.choice(QUERIES)
+    lines.append(format_line(step(0.001), f"Not Blacklisting recognized hotkey {hotkey}"))
+    lines.append(format_line(step(0.001), f"Received scraping request: {videos} videos for query '{query}'"))
+    lines.append(format_line(step(0.001), f"Random topic from list: {rng.choice(TOPICS)}"))
+    augmentation = round(rng.uniform(0.2, 2.0), 2)
+    lines.append(format_line(step(augmentation), f"Augmented query: '{query}' -> '{query.lower()} clips'"))
+    lines.append(format_line(step(0.001), f"Query augmentation took {augmentation} s"))
+
+    found = videos + rng.randint(0, videos)
+    search = round(rng.uniform(0.5, 4.0), 2)
+    lines.append(format_line(step(search), f"Removed {rng.randint(0, 80)} duplicate search results."))
+    lines.append(format_line(step(0.001), f"Video search took {search} s: found {found} videos"))
+    lines.append(format_line(step(0.001), f"Starting concurrent download with {found} videos"))
+
+    video_ids = []
+    for _ in range(found):
+        # Some videos come from a shared pool so cross-job repeats show up
+        if repeat_pool and rng.random() < 0.2:
+            video_ids.append(rng.choice(repeat_pool))
+        else:
+            video_ids.append(_video_id(rng))
+    for video_id in video_ids:
+        proxy = rng.choice(PROXIES)
+        lines.append(format_line(step(0.001), f"Using proxy: {proxy}"))
+        if rng.random() < 0.9:
+            took = round(rng.lognormvariate(0.5, 0.6), 2)
+            lines.append(format_line(step(0.01), f"Downloaded video {video_id} in {took} s. Proxy used: {proxy} ({took})"))
+
+    download = round(rng.uniform(2.0, 20.0), 2)
+    downloaded = min(videos, found)
+    lines.append(format_line(step(download), f"Downloaded and clipped {downloaded} videos in {download} seconds"))
+    embedding = round(rng.uniform(0.5, 5.0), 2)
+    lines.append(format_line(step(embedding), f"Embeddings generation took {embedding} s"))
+
+    failed = rng.random() < fail_rate
+    delivered = 0 if failed else downloaded
+    lines.append(format_line(step(rng.uniform(0.1, 3.0)), f"Data received from load balancer: {rng.randint(1000, 10**6)}"))
+    metadata = ', '.join(
+        f"VideoMetadata(video_id='{video_id}', description='Synthetic video {n}', views={rng.randint(1, 10**6)}, "
+        f"start_time={n * 5}, end_time={n * 5 + 5}, video_emb=[], audio_emb=[], description_emb=[])"
+        for n, video_id in enumerate(video_ids[:delivered])
+    )
+    lines.append(format_line(step(0.001), f"Received response: [{metadata}]"))
+    lines.append(format_line(step(0.1), f"{delivered} unique videos prepared"))
+    for n, video_id in enumerate(video_ids[:delivered], 1):
+        lines.append(format_line(step(0.001), f"{n}. {video_id}: Synthetic video {n} [{n * 5}..{n * 5 + 5}] {rng.randint(1, 10**6)}"))
+
+    total = round(augmentation + search + download + embedding + rng.uniform(0.5, 3.0), 2)
+    if failed:
+        lines.append(format_line(step(0.1), f"SCRAPING FAILED: Scraped 0/{videos} videos in {total} s", 'ERROR'))
+    else:
+        lines.append(format_line(step(0.1), f"SCRAPING SUCCEEDED: Scraped {delivered}/{videos} videos in {total} s", 'SUCCESS'))
+    if rng.random() < 0.2:
+        incentive = round(rng.uniform(0, 0.01), 4)
+        lines.append(format_line(step(1.0), (
+            f"Block: {rng.randint(3_000_000, 4_000_000)} | Stake: 1.0000 | Rank: 0.0010 | Trust: 0.9000 | "
+            f"Consensus: 0.0020 | Incentive: {incentive:.4f} | Emission/day: 1.2345"
+        )))
+    return lines
+
+
+def generate_log_lines(jobs: int, seed: int = 0, start: Optional[datetime] = None,
+                       blacklist_rate: float = 0.1, fail_rate: float = 0.1, videos: int = 8) -> Iterator[str]:
+    """Yield a reproducible synthetic worker log with `jobs` requests."""
+    rng = random.Random(seed)
+    ts = start or datetime(2024, 6, 18, 14, 0, 0)
+    hotkeys = ['5' + ''.join(rng.choice(string.ascii_letters + string.digits) for _ in range(47)) for _ in range(20)]
+    repeat_pool = [_video_id(rng) for _ in range(50)]
+    for _ in range(jobs):
+        uid = rng.randint(0, 255)
+        yield from generate_job_lines(
+            rng, ts, uid, hotkeys[uid % len(hotkeys)], blacklist_rate, fail_rate, videos, repeat_pool
+        )
+        ts += timedelta(seconds=rng.uniform(5, 60))
+
+
+def write_synthetic_log(path: str, jobs: int, seed: int = 0, **kwargs) -> int:
+    """Write a synthetic log to `path` and return its size in bytes."""
+    size = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for line in generate_log_lines(jobs, seed, **kwargs):
+            size += f.write(line)
+    return size
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    arg_parser = argparse.ArgumentParser(description='Write a synthetic worker log for testing and benchmarks.')
+    arg_parser.add_argument('output', help='Log file to write')
+    arg_parser.add_argument('--jobs', type=int, default=1000)
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--blacklist-rate', type=float, default=0.1)
+    arg_parser.add_argument('--fail-rate', type=float, default=0.1)
+    arg_parser.add_argument('--videos', type=int, default=8, help='Videos requested per job')
+    args = arg_parser.parse_args()
+
+    size = write_synthetic_log(
+        args.output, args.jobs, args.seed,
+        blacklist_rate=args.blacklist_rate, fail_rate=args.fail_rate, videos=args.videos
+    )
+    logging.getLogger(__name__).info(f"Wrote {args.jobs} jobs ({size / 1e6:.1f} MB) to {args.output}")
+
+if __name__ == "__main__":
+    main()
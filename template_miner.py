@@ -0,0 +1,181 @@
+import re
+import sys
+import json
+import argparse
+import logging
+from typing import Dict, List, Optional, Any
+
+from enhanced_worker_log_parser import KNOWN_PATTERN, MAX_LINE_LENGTH
+from log_patterns import LogPattern
+from log_reader import iter_log_lines
+from unrecognized_lines import mask_line, strip_ansi
+
+WILDCARD = '<*>'
+# Placeholders produced by mask_line and the regex each one stands for
+PLACEHOLDER_PATTERNS = {
+    '<TS>': r'\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(?:\.\d+)?',
+    '<HOTKEY>': r'5[1-9A-HJ-NP-Za-km-z]{47}',
+    '<IP>': r'\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?',
+    '<HASH>': r'(?:0x)?[0-9a-fA-F]+',
+    '<NUM>': r'\d+(?:\.\d+)?',
+    WILDCARD: r'\S+',
+}
+PLACEHOLDER_SPLIT = re.compile('(' + '|'.join(re.escape(p) for p in PLACEHOLDER_PATTERNS) + ')')
+
+
+class LogCluster:
+    """A group of lines sharing one template."""
+
+    def __init__(self, cluster_id: int, tokens: List[str], example: str):
+        self.cluster_id = cluster_id
+        self.tokens = tokens
+        self.count = 1
+        self.examples = [example]
+
+    @property
+    def template(self) -> str:
+        return ' '.join(self.tokens)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'cluster_id': self.cluster_id, 'template': self.template, 'count': self.count, 'examples': self.examples}
+
+
+class DrainTemplateMiner:
+    """Online log template miner using Drain's fixed-depth parse tree.
+
+    Lines are routed by token count and then by their first ``depth - 2``
+    tokens, so each line is only compared against the handful of clusters in
+    one leaf. A line joins the most similar cluster if at least ``similarity``
+    of its tokens match; differing positions become wildcards.
+    """
+
+    def __init__(self, depth: int = 4, similarity: float = 0.5, max_children: int = 100,
+                 max_clusters: Optional[int] = None, max_examples: int = 3):
+        if depth < 3:
+            raise ValueError("depth must be at least 3")
+        self.prefix_depth = depth - 2
+        self.similarity = similarity
+        self.max_children = max_children
+        self.max_clusters = max_clusters
+        self.max_examples = max_examples
+        self.root: Dict[int, Dict] = {}
+        self.clusters: List[LogCluster] = []
+        self.lines_seen = 0
+
+    def _leaf(self, tokens: List[str]) -> List[LogCluster]:
+        node = self.root.setdefault(len(tokens), {})
+        for token in tokens[:self.prefix_depth]:
+            # Tokens holding a placeholder or digit would explode the tree
+            if token.startswith('<') or any(c.isdigit() for c in token):
+                token = WILDCARD
+            child = node.get(token)
+            if child is None:
+                if len(node) >= self.max_children:
+                    token = WILDCARD
+                    child = node.get(token)
+                if child is None:
+                    child = node[token] = {}
+            node = child
+        return node.setdefault('clusters', [])
+
+    def _best_match(self, clusters: List[LogCluster], tokens: List[str]) -> Optional[LogCluster]:
+        best, best_score, best_params = None, -1.0, -1
+        for cluster in clusters:
+            same = params = 0
+            for template_token, token in zip(cluster.tokens, tokens):
+                if template_token == WILDCARD:
+                    params += 1
+                elif template_token == token:
+                    same += 1
+            score = same / len(tokens)
+            if score > best_score or (score == best_score and params > best_params):
+                best, best_score, best_params = cluster, score, params
+        if best is not None and best_score >= self.similarity:
+            return best
+        return None
+
+    def add_line(self, line: str) -> Optional[LogCluster]:
+        """Assign a line to a cluster, creating one if nothing is similar enough."""
+        tokens = mask_line(line).split()
+        if not tokens:
+            return None
+        self.lines_seen += 1
+        clusters = self._leaf(tokens)
+        cluster = self._best_match(clusters, tokens)
+        if cluster is None:
+            if self.max_clusters is not None and len(self.clusters) >= self.max_clusters:
+                return None
+            cluster = LogCluster(len(self.clusters), tokens, strip_ansi(line).strip())
+            clusters.append(cluster)
+            self.clusters.append(cluster)
+            return cluster
+
+        cluster.count += 1
+        cluster.tokens = [
+            template_token if template_token == token else WILDCARD
+            for template_token, token in zip(cluster.tokens, tokens)
+        ]
+        if len(cluster.examples) < self.max_examples:
+            cluster.examples.append(strip_ansi(line).strip())
+        return cluster
+
+    def templates(self, min_count: int = 1) -> List[LogCluster]:
+        return sorted((c for c in self.clusters if c.count >= min_count), key=lambda c: c.count, reverse=True)
+
+
+def template_to_regex(template: str) -> str:
+    """Turn a mined template into a regex usable in a LogPattern."""
+    parts = []
+    for part in PLACEHOLDER_SPLIT.split(template):
+        if part in PLACEHOLDER_PATTERNS:
+            parts.append(PLACEHOLDER_PATTERNS[part])
+        elif part:
+            parts.append(re.escape(part).replace(r'\ ', r'\s+'))
+    return ''.join(parts)
+
+
+def candidate_patterns(miner: DrainTemplateMiner, min_count: int = 2, priority: int = 100) -> List[LogPattern]:
+    """Propose LogPattern entries for mined templates, most frequent first."""
+    candidates = []
+    for cluster in miner.templates(min_count):
+        # Drop the "<TS> | LEVEL |" prefix so the pattern matches the message itself
+        parts = cluster.template.split(' | ', 2)
+        message = parts[2] if len(parts) == 3 and parts[0] == '<TS>' else cluster.template
+        if not message.strip(WILDCARD + ' '):
+            continue
+        candidates.append(LogPattern(
+            name=f'mined_{cluster.cluster_id}',
+            patterns=[template_to_regex(message)],
+            priority=priority,
+            example=cluster.examples[0],
+            category='mined'
+        ))
+    return candidates
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    arg_parser = argparse.ArgumentParser(description='Mine log templates and propose new LogPatterns.')
+    arg_parser.add_argument('log_path', help='Log file to mine (plain, gzip or zstd)')
+    arg_parser.add_argument('--min-count', type=int, default=2, help='Only propose templates seen this often')
+    arg_parser.add_argument('--similarity', type=float, default=0.5)
+    arg_parser.add_argument('--depth', type=int, default=4)
+    arg_parser.add_argument('--include-known', action='store_true',
+                            help='Also mine lines already matched by log_patterns.ALL_PATTERNS')
+    args = arg_parser.parse_args()
+
+    miner = DrainTemplateMiner(depth=args.depth, similarity=args.similarity)
+    for line in iter_log_lines(args.log_path):
+        # Only the start of a huge line is matched, as in the parser
+        if args.include_known or not KNOWN_PATTERN.search(line[:MAX_LINE_LENGTH]):
+            miner.add_line(line)
+
+    candidates = candidate_patterns(miner, args.min_count)
+    logging.getLogger(__name__).info(
+        f"Mined {len(miner.clusters)} templates from {miner.lines_seen} lines, {len(candidates)} candidates"
+    )
+    json.dump([candidate.__dict__ for candidate in candidates], sys.stdout, indent=2)
+    print()
+
+if __name__ == "__main__":
+    main()
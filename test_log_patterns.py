@@ -0,0 +1,25 @@
+from enhanced_worker_log_parser import EnhancedWorkerLogParser
+from log_patterns import ALL_PATTERNS
+from regex_benchmark import pathological_lines, time_line
+
+# Generous next to the benchmark's own budget, so the test isn't flaky on slow machines
+MAX_SECONDS_PER_LINE = 0.5
+
+
+def test_pattern_examples_are_recognized():
+    parser = EnhancedWorkerLogParser()
+    for name in ('video_details', 'proxy_usage', 'search_results'):
+        assert parser._is_recognized(ALL_PATTERNS[name].example), name
+
+
+def test_video_details_with_quotes_in_title():
+    parser = EnhancedWorkerLogParser()
+    line = "video_id='bGo5OOTnmvw' title=\"Don't stop\" description='a: b' length=495 views=95851"
+    assert parser._is_recognized(line)
+
+
+def test_pathological_lines_are_fast():
+    parser = EnhancedWorkerLogParser()
+    for name, line in pathological_lines(50_000).items():
+        recognize, process = time_line(parser, line)
+        assert max(recognize, process) < MAX_SECONDS_PER_LINE, name
@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from reward_join import JobPoint, RewardPoint, join_group
+
+
+def job(job_id: str, start: datetime) -> JobPoint:
+    return JobPoint(start.timestamp(), job_id, start.isoformat(), 'succeeded', ())
+
+
+def reward(row_number: str, time: datetime) -> RewardPoint:
+    return RewardPoint(time.timestamp(), row_number, 1.0)
+
+
+def pairs(jobs, rewards):
+    return [
+        (j.job_id if j else None, r.row_number if r else None) for j, r in join_group(jobs, rewards)
+    ]
+
+
+def test_reward_goes_to_job_that_started_in_its_minute_first():
+    jobs = [job('A', datetime(2024, 6, 18, 10, 0, 5)), job('B', datetime(2024, 6, 18, 10, 0, 55))]
+    rewards = [reward('r0', datetime(2024, 6, 18, 10, 0))]
+    assert pairs(jobs, rewards) == [('A', 'r0'), ('B', None)]
+
+
+def test_backlog_is_matched_in_order():
+    jobs = [job(name, datetime(2024, 6, 18, 10, 0, second)) for name, second in (('A', 1), ('B', 2), ('C', 3))]
+    rewards = [reward(f'r{n}', datetime(2024, 6, 18, 10, 1 + n)) for n in range(3)]
+    assert pairs(jobs, rewards) == [('A', 'r0'), ('B', 'r1'), ('C', 'r2')]
+
+
+def test_jobs_after_the_reward_minute_are_not_matched():
+    jobs = [job('A', datetime(2024, 6, 18, 10, 1, 30))]
+    rewards = [reward('r0', datetime(2024, 6, 18, 10, 0))]
+    assert pairs(jobs, rewards) == [(None, 'r0'), ('A', None)]
@@ -0,0 +1,66 @@
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+ANSI_PATTERN = re.compile(r'\x1b\[[\d;]*m')
+MASKS = [
+    (re.compile(r'\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(?:\.\d+)?'), '<TS>'),
+    # SS58 addresses (hotkeys / coldkeys)
+    (re.compile(r'\b5[1-9A-HJ-NP-Za-km-z]{47}\b'), '<HOTKEY>'),
+    (re.compile(r'\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b'), '<IP>'),
+    (re.compile(r'\b0x[0-9a-fA-F]+\b|\b[0-9a-fA-F]{16,}\b'), '<HASH>'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '<NUM>'),
+]
+
+
+def strip_ansi(line: str) -> str:
+    return ANSI_PATTERN.sub('', line)
+
+
+def mask_line(line: str) -> str:
+    """Reduce a log line to a template by masking variable parts."""
+    template = strip_ansi(line).strip()
+    for pattern, replacement in MASKS:
+        template = pattern.sub(replacement, template)
+    return template
+
+
+class UnrecognizedLineStore:
+    """Bounded store of unrecognized lines, clustered by masked template.
+
+    Keeps a count and a few samples per template. Once max_templates distinct
+    templates have been seen, lines of new templates are only counted.
+    """
+
+    def __init__(self, max_templates: int = 500, max_samples: int = 3, max_sample_length: int = 500):
+        self.max_templates = max_templates
+        self.max_samples = max_samples
+        self.max_sample_length = max_sample_length
+        self.templates: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self.total = 0
+        self.dropped = 0
+
+    def add(self, line: str) -> None:
+        self.total += 1
+        template = mask_line(line[:self.max_sample_length * 4])
+        entry = self.templates.get(template)
+        if entry is None:
+            if len(self.templates) >= self.max_templates:
+                self.dropped += 1
+                return
+            entry = self.templates[template] = {'template': template, 'count': 0, 'samples': []}
+        entry['count'] += 1
+        if len(entry['samples']) < self.max_samples:
+            sample = strip_ansi(line).strip()[:self.max_sample_length]
+            if sample not in entry['samples']:
+                entry['samples'].append(sample)
+
+    def __len__(self) -> int:
+        return self.total
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Return templates ordered by how often they were seen."""
+        return sorted(self.templates.values(), key=lambda entry: entry['count'], reverse=True)
+
+    def stats(self) -> Dict[str, int]:
+        return {'total': self.total, 'templates': len(self.templates), 'dropped': self.dropped}
@@ -0,0 +1,222 @@
+import sys
+import json
+import heapq
+import argparse
+import logging
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from enhanced_worker_log_parser import WorkerJob
+from log_merge import iter_merged_jobs
+
+BASE64URL = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'
+BASE64URL_INDEX = {c: i for i, c in enumerate(BASE64URL)}
+NO_OCCURRENCE = -1
+# How many earlier occurrences of a video to compare clip ranges against
+MAX_DUPLICATE_SCAN = 64
+
+
+def pack_video_id(video_id: str) -> Union[int, str]:
+    """Pack an 11 character YouTube id into a 64 bit int.
+
+    YouTube ids encode 64 bits: ten base64url characters plus a last
+    character that only carries 4 bits. Anything else is kept as a string.
+    """
+    if len(video_id) != 11:
+        return video_id
+    value = 0
+    for c in video_id[:10]:
+        index = BASE64URL_INDEX.get(c)
+        if index is None:
+            return video_id
+        value = (value << 6) | index
+    last = BASE64URL_INDEX.get(video_id[10])
+    if last is None or last & 3:
+        return video_id
+    return (value << 4) | (last >> 2)
+
+
+def unpack_video_id(key: Union[int, str]) -> str:
+    if isinstance(key, str):
+        return key
+    chars = [BASE64URL[(key & 15) << 2]]
+    key >>= 4
+    for _ in range(10):
+        chars.append(BASE64URL[key & 63])
+        key >>= 6
+    return ''.join(reversed(chars))
+
+
+def _parse_clip(clip: Optional[str]) -> Tuple[int, int]:
+    try:
+        start, end = clip.split('..')
+        return int(start), int(end)
+    except (AttributeError, ValueError):
+        return -1, -1
+
+
+def job_videos(job: WorkerJob) -> Dict[str, Dict[str, int]]:
+    """Collect the distinct videos a job handled with their clip range and views."""
+    videos = {}
+    stages = job.stages or {}
+    load_balancer = (stages.get('processing') or {}).get('load_balancer') or {}
+    for item in load_balancer.get('received_metadata') or []:
+        videos[item['video_id']] = {
+            'clip_start': item['clip_start'], 'clip_end': item['clip_end'], 'views': item['views']
+        }
+    for video in (job.results or {}).get('final_videos') or []:
+        if video['video_id'] not in videos:
+            clip_start, clip_end = _parse_clip(video.get('clip'))
+            videos[video['video_id']] = {'clip_start': clip_start, 'clip_end': clip_end, 'views': video['views']}
+    return videos
+
+
+class VideoIndex:
+    """Compact video_id -> jobs index built while streaming jobs.
+
+    Video ids are packed into ints and every occurrence lives in parallel
+    typed arrays, chained per video as a linked list, so millions of ids fit
+    in a few tens of bytes each beyond the id lookup table.
+    """
+
+    def __init__(self):
+        self._slots: Dict[Union[int, str], int] = {}
+        # Per video slot
+        self._keys: List[Union[int, str]] = []
+        self._last_occurrence = array('q')
+        self._occurrence_count = array('I')
+        # Per occurrence
+        self._job_number = array('I')
+        self._previous = array('q')
+        self._clip_start = array('i')
+        self._clip_end = array('i')
+        self._views = array('q')
+        self._download_time = array('f')
+        self._duplicate_clip = array('b')
+        self._wasted_download_time = 0.0
+        self.job_ids: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add_job(self, job: WorkerJob) -> None:
+        videos = job_videos(job)
+        if not videos:
+            return
+        job_number = len(self.job_ids)
+        self.job_ids.append(job.job_id)
+
+        # Spread the job's download time evenly over the videos it downloaded
+        download = (job.stages or {}).get('download') or {}
+        downloaded = download.get('downloaded_videos') or len(videos)
+        per_video_time = (download.get('download_time') or 0.0) / downloaded
+
+        for video_id, video in videos.items():
+            key = pack_video_id(video_id)
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._slots[key] = len(self._keys)
+                self._keys.append(key)
+                self._last_occurrence.append(NO_OCCURRENCE)
+                self._occurrence_count.append(0)
+
+            previous = self._last_occurrence[slot]
+            if previous != NO_OCCURRENCE:
+                self._wasted_download_time += per_video_time
+            duplicate = False
+            occurrence = previous
+            for _ in range(MAX_DUPLICATE_SCAN):
+                if occurrence == NO_OCCURRENCE:
+                    break
+                if (self._clip_start[occurrence] == video['clip_start']
+                        and self._clip_end[occurrence] == video['clip_end']):
+                    duplicate = True
+                    break
+                occurrence = self._previous[occurrence]
+
+            self._last_occurrence[slot] = len(self._job_number)
+            self._occurrence_count[slot] += 1
+            self._job_number.append(job_number)
+            self._previous.append(previous)
+            self._clip_start.append(video['clip_start'])
+            self._clip_end.append(video['clip_end'])
+            self._views.append(video['views'] or 0)
+            self._download_time.append(per_video_time)
+            self._duplicate_clip.append(duplicate)
+
+    def consume(self, jobs: Iterable[WorkerJob]) -> 'VideoIndex':
+        for job in jobs:
+            self.add_job(job)
+        return self
+
+    def _occurrences(self, slot: int) -> List[int]:
+        occurrences = []
+        occurrence = self._last_occurrence[slot]
+        while occurrence != NO_OCCURRENCE:
+            occurrences.append(occurrence)
+            occurrence = self._previous[occurrence]
+        occurrences.reverse()
+        return occurrences
+
+    def occurrences(self, video_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Every job a video appeared in, oldest first."""
+        slot = self._slots.get(pack_video_id(video_id))
+        if slot is None:
+            return []
+        return [{
+            'job_id': self.job_ids[self._job_number[o]],
+            'clip_start': self._clip_start[o],
+            'clip_end': self._clip_end[o],
+            'views': self._views[o],
+            'download_time': self._download_time[o],
+            'duplicate_clip': bool(self._duplicate_clip[o])
+        } for o in self._occurrences(slot)[:limit]]
+
+    def repeat_histogram(self) -> Dict[int, int]:
+        """Number of videos seen in exactly n jobs, keyed by n."""
+        return dict(sorted(Counter(self._occurrence_count).items()))
+
+    def wasted_download_time(self, slot: Optional[int] = None) -> float:
+        """Download time spent on every occurrence after a video's first."""
+        if slot is None:
+            return self._wasted_download_time
+        return sum(self._download_time[o] for o in self._occurrences(slot)[1:])
+
+    def top_repeated(self, n: int = 20, max_occurrences: int = 50) -> List[Dict[str, Any]]:
+        """The n videos seen in the most jobs."""
+        slots = heapq.nlargest(n, range(len(self._keys)), key=lambda s: self._occurrence_count[s])
+        return [{
+            'video_id': unpack_video_id(self._keys[slot]),
+            'jobs': self._occurrence_count[slot],
+            'wasted_download_time': self.wasted_download_time(slot),
+            'occurrences': self.occurrences(unpack_video_id(self._keys[slot]), max_occurrences)
+        } for slot in slots if self._occurrence_count[slot] > 1]
+
+    def summary(self) -> Dict[str, Any]:
+        occurrences = len(self._job_number)
+        return {
+            'jobs': len(self.job_ids),
+            'videos': len(self._keys),
+            'occurrences': occurrences,
+            'repeated_videos': sum(1 for count in self._occurrence_count if count > 1),
+            'repeat_occurrences': occurrences - len(self._keys),
+            'duplicate_clip_deliveries': sum(self._duplicate_clip),
+            'wasted_download_time': self.wasted_download_time(),
+            'repeat_histogram': self.repeat_histogram()
+        }
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    arg_parser = argparse.ArgumentParser(description='Find videos downloaded and delivered in several jobs.')
+    arg_parser.add_argument('log_paths', nargs='+', help='Worker logs (plain, gzip or zstd)')
+    arg_parser.add_argument('--top', type=int, default=20, help='How many of the most repeated videos to list')
+    args = arg_parser.parse_args()
+
+    index = VideoIndex().consume(iter_merged_jobs(args.log_paths))
+    json.dump({'summary': index.summary(), 'top_repeated': index.top_repeated(args.top)}, sys.stdout, indent=2)
+    print()
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,13 @@
 import re
 import json
+import argparse
 from datetime import datetime
 from typing import List, Dict, Optional, Any
 from dataclasses import dataclass, asdict
 import logging
 
+from log_reader import open_log
+
 @dataclass
 class RequestMetadata:
     timestamp: str
@@ -185,7 +188,7 @@ class WorkerLogParser:
         requests = []
         current_lines = []
         
-        with open(log_path, 'r', encoding='utf-8') as f:
+        with open_log(log_path) as f:
             lines = f.readlines()
             
         # Group lines by request
@@ -229,16 +232,21 @@ class WorkerLogParser:
 
 def main():
     logging.basicConfig(level=logging.INFO)
+    arg_parser = argparse.ArgumentParser(description='Parse a worker log into a JSON list of requests.')
+    arg_parser.add_argument('log_path', nargs='?', default='example_worker.txt')
+    arg_parser.add_argument('-o', '--output', default='parsed_worker_log.json')
+    args = arg_parser.parse_args()
+
     parser = WorkerLogParser()
     
     # Parse the log file
-    requests = parser.parse_log('example_worker.txt')
+    requests = parser.parse_log(args.log_path)
     
     # Write to JSON file
-    with open('parsed_worker_log.json', 'w', encoding='utf-8') as f:
+    with open(args.output, 'w', encoding='utf-8') as f:
         json.dump(requests, f, indent=2)
     
-    print(f"Parsed {len(requests)} requests to parsed_worker_log.json")
+    print(f"Parsed {len(requests)} requests to {args.output}")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file